@@ -0,0 +1,188 @@
+"""
+Endpoint benchmarks driven through the real URL routes.
+
+Each :class:`Endpoint` is requested repeatedly with the Django test client
+(full middleware, DRF and JWT stack) against whatever data is in the current
+database. Per endpoint we record p50/p95 latency, SQL query count and SQL
+time; results are plain JSON so they can be stored as baselines and compared
+against later runs with :func:`compare_results`.
+"""
+import json
+import math
+import platform
+import statistics
+import time
+from dataclasses import dataclass, field
+import django
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from brokers.models import Category, Product
+
+User = get_user_model()
+
+BENCHMARK_USERNAME = 'benchmark'
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# Latency changes smaller than this are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+@dataclass
+class Endpoint:
+    """A request to benchmark; ``kwargs``/``params`` may use fixture values"""
+    name: str
+    url_name: str
+    method: str = 'get'
+    kwargs: dict = field(default_factory=dict)
+    params: dict = field(default_factory=dict)
+    auth: bool = False
+
+    def request(self, client, fixtures):
+        url = reverse(self.url_name, kwargs={key: value.format(**fixtures) for key, value in self.kwargs.items()})
+        params = {key: value.format(**fixtures) for key, value in self.params.items()}
+        headers = {'HTTP_AUTHORIZATION': f"Bearer {fixtures['access']}"} if self.auth else {}
+        if self.method == 'get':
+            return client.get(url, params, **headers)
+        return client.post(url, json.dumps(params), content_type='application/json', **headers)
+
+
+ENDPOINTS = [
+    Endpoint('product-list', 'brokers:product-list'),
+    Endpoint('product-search', 'brokers:product-list', params={'search': '{search}'}),
+    Endpoint('product-filter', 'brokers:product-list', params={
+        'category': '{root_category}', 'condition': 'good', 'ordering': 'price',
+    }),
+    Endpoint('product-facets', 'brokers:product-facets', params={'category': '{root_category}'}),
+    Endpoint('product-detail', 'brokers:product-detail', kwargs={'slug': '{product}'}),
+    Endpoint('category-list', 'brokers:category-list', auth=True),
+    Endpoint('category-products', 'brokers:category-products', kwargs={'slug': '{root_category}'}, auth=True),
+    Endpoint('auth-login', 'authentication:login', method='post', params={
+        'username': BENCHMARK_USERNAME, 'password': BENCHMARK_PASSWORD,
+    }),
+    Endpoint('auth-refresh', 'authentication:token_refresh', method='post', params={'refresh': '{refresh}'}),
+    Endpoint('profile-me', 'profile-me', auth=True),
+]
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook counting and timing SQL queries"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def prepare_fixtures():
+    """Benchmark user, tokens and sample slugs taken from the current data"""
+    user, created = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+    if created or not user.check_password(BENCHMARK_PASSWORD):
+        user.set_password(BENCHMARK_PASSWORD)
+        user.save()
+    product = Product.objects.filter(is_active=True, is_sold=False).order_by('-view_count', 'pk').first()
+    category = Category.objects.filter(is_active=True, parent=None).order_by('sort_order', 'pk').first()
+    if product is None or category is None:
+        return None
+    refresh = RefreshToken.for_user(user)
+    return {
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+        'product': product.slug,
+        'root_category': category.slug,
+        'search': product.brand or product.title.split()[0],
+    }
+
+
+def measure(endpoint, client, fixtures, requests, warmup):
+    """Latency and SQL figures of ``requests`` calls after ``warmup`` calls"""
+    for _ in range(warmup):
+        endpoint.request(client, fixtures)
+
+    latencies, query_counts, sql_times, statuses = [], [], [], set()
+    for _ in range(requests):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            started = time.perf_counter()
+            response = endpoint.request(client, fixtures)
+            latencies.append((time.perf_counter() - started) * 1000)
+        query_counts.append(recorder.count)
+        sql_times.append(recorder.duration * 1000)
+        statuses.add(response.status_code)
+
+    return {
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries': percentile(query_counts, 50),
+        'max_queries': max(query_counts),
+        'sql_ms': round(percentile(sql_times, 50), 3),
+        'status': sorted(statuses),
+    }
+
+
+def run_benchmarks(requests=50, warmup=5, endpoints=None, on_result=None):
+    """Benchmark ``endpoints`` (all by default) and return the result document"""
+    fixtures = prepare_fixtures()
+    if fixtures is None:
+        raise ValueError('The database has no active products or categories to benchmark.')
+    selected = [endpoint for endpoint in ENDPOINTS if not endpoints or endpoint.name in endpoints]
+    client = Client(REMOTE_ADDR='10.255.0.1')
+
+    results = {}
+    for endpoint in selected:
+        results[endpoint.name] = measure(endpoint, client, fixtures, requests, warmup)
+        if on_result:
+            on_result(endpoint.name, results[endpoint.name])
+
+    return {
+        'meta': {
+            'created_at': timezone.now().isoformat(),
+            'requests': requests,
+            'warmup': warmup,
+            'products': Product.objects.count(),
+            'categories': Category.objects.count(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'endpoints': results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.2):
+    """
+    Regressions of ``current`` against ``baseline`` as readable strings.
+
+    Latency regresses when p50 or p95 grows by more than ``threshold``
+    (and by more than ``MIN_LATENCY_DELTA_MS``); query counts are
+    deterministic, so any increase is a regression.
+    """
+    regressions = []
+    for name, result in current['endpoints'].items():
+        base = baseline['endpoints'].get(name)
+        if base is None:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            limit = max(base[key] * (1 + threshold), base[key] + MIN_LATENCY_DELTA_MS)
+            if result[key] > limit:
+                regressions.append(f'{name}: {key} {base[key]:.1f} → {result[key]:.1f}')
+        if result['queries'] > base['queries']:
+            regressions.append(f"{name}: queries {base['queries']} → {result['queries']}")
+    return regressions
@@ -0,0 +1,92 @@
+"""
+Readiness checks for the orchestrator.
+
+Each check does one round trip (database, cache, Celery broker) or
+compares the migration graph with the database, and reports whether it
+passed and how long it took. Results are kept in process memory for
+``READINESS_CACHE_SECONDS`` so frequent probes neither add load nor depend
+on the cache being up.
+"""
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from core.celery import app as celery_app
+
+BROKER_TIMEOUT = 1
+
+_lock = threading.Lock()
+_cached = {'expires': 0.0, 'result': None}
+_migrations_applied = False
+
+
+def check_database():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def check_cache():
+    key = 'api:readiness'
+    value = str(time.time_ns())
+    cache.set(key, value, timeout=30)
+    if cache.get(key) != value:
+        raise RuntimeError('Cache round trip returned a different value')
+
+
+def check_migrations():
+    global _migrations_applied
+    # Applied migrations cannot become unapplied for this code version, so
+    # the graph is only loaded until the first success
+    if _migrations_applied:
+        return
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise RuntimeError(f'{len(plan)} unapplied migration(s)')
+    _migrations_applied = True
+
+
+def check_broker():
+    with celery_app.connection_for_read(connect_timeout=BROKER_TIMEOUT) as conn:
+        conn.ensure_connection(max_retries=1, interval_start=0, interval_step=0, timeout=BROKER_TIMEOUT)
+
+
+CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'migrations': check_migrations,
+    'broker': check_broker,
+}
+
+
+def run_checks():
+    """``{'ready': bool, 'checks': {name: {'ok', 'ms'[, 'error']}}}``"""
+    checks = {}
+    for name, check in CHECKS.items():
+        started = time.perf_counter()
+        try:
+            check()
+            checks[name] = {'ok': True}
+        except Exception as error:
+            # Messages can name hosts, so anonymous probes only see the type
+            detail = str(error) if settings.DEBUG else ''
+            checks[name] = {'ok': False, 'error': detail or error.__class__.__name__}
+        checks[name]['ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return {'ready': all(check['ok'] for check in checks.values()), 'checks': checks}
+
+
+def get_readiness():
+    """Readiness result, at most ``READINESS_CACHE_SECONDS`` old"""
+    with _lock:
+        now = time.monotonic()
+        if _cached['result'] is None or now >= _cached['expires']:
+            _cached['result'] = {**run_checks(), 'checked_at': time.time()}
+            _cached['expires'] = now + settings.READINESS_CACHE_SECONDS
+        return _cached['result']
+
+
+def clear_readiness():
+    _cached['result'] = None
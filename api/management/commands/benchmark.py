@@ -0,0 +1,127 @@
+import json
+import tempfile
+from contextlib import ExitStack
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from api.benchmark import ENDPOINTS, compare_results, run_benchmarks
+from brokers.models import Product
+
+CACHE_BACKENDS = {
+    'locmem': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'dummy': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API endpoints (latency, SQL queries, SQL time) on a seeded dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000, help='Seed the dataset up to this many products')
+        parser.add_argument('--views', type=int, default=50000, help='Product views to seed with the products')
+        parser.add_argument('--images-per-product', type=int, default=3, help='Images to seed per product')
+        parser.add_argument('--categories-depth', type=int, default=3, help='Levels of the seeded category tree')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the seeded dataset')
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per endpoint')
+        parser.add_argument(
+            '--endpoint', action='append', choices=[endpoint.name for endpoint in ENDPOINTS],
+            help='Only benchmark this endpoint (repeatable)'
+        )
+        parser.add_argument(
+            '--cache', choices=['configured', *CACHE_BACKENDS],
+            help='Cache backend to benchmark with (default: dummy, so cached endpoints are measured cold; '
+                 '"configured" needs --use-current-db)'
+        )
+        parser.add_argument('--output', help='Write the results as a JSON baseline to this path')
+        parser.add_argument('--compare', help='Compare against a JSON baseline and fail on regressions')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Allowed relative latency increase before flagging a regression (default: 0.2)'
+        )
+        parser.add_argument(
+            '--use-current-db', action='store_true',
+            help='Benchmark (and seed) the configured database instead of a throwaway test database'
+        )
+        parser.add_argument('--keepdb', action='store_true', help='Keep and reuse the seeded test database')
+
+    def handle(self, *args, **options):
+        cache = options['cache'] or ('configured' if options['use_current_db'] else 'dummy')
+        if cache == 'configured' and not options['use_current_db']:
+            # The configured cache is shared with the live site: synthetic
+            # trees and responses would be stored under live generation keys
+            raise CommandError('--cache configured is only allowed with --use-current-db.')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+
+        with ExitStack() as stack:
+            if not options['use_current_db']:
+                stack.callback(self.teardown_database, self.setup_database(options['keepdb']))
+                stack.enter_context(override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='benchmark-media-')))
+            if cache != 'configured':
+                stack.enter_context(override_settings(CACHES=CACHE_BACKENDS[cache]))
+            # Keep benchmark hits out of the real analytics queue
+            stack.enter_context(override_settings(BROKERS_TRACK_PRODUCT_VIEWS=False))
+            self.seed(options)
+            results = self.run(options)
+        results['meta']['cache'] = cache
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"✓ Baseline written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare_results(baseline, results, options['threshold'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f'  ✗ {regression}'))
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}.')
+            self.stdout.write(self.style.SUCCESS(f"✓ No regressions against {options['compare']}"))
+
+    def setup_database(self, keepdb):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb, serialize=False)
+        self.stdout.write(f"→ Using test database {connection.settings_dict['NAME']}")
+        return old_name, keepdb
+
+    def teardown_database(self, state):
+        old_name, keepdb = state
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+    def seed(self, options):
+        missing = options['products'] - Product.objects.count()
+        if missing <= 0:
+            self.stdout.write(f'→ Dataset already has {options["products"]} products, not seeding')
+            return
+        self.stdout.write(f'Seeding {missing} products...')
+        call_command(
+            'generate_load_data',
+            products=missing,
+            views=options['views'],
+            images_per_product=options['images_per_product'],
+            categories_depth=options['categories_depth'],
+            seed=options['seed'],
+            stdout=self.stdout,
+        )
+
+    def run(self, options):
+        self.stdout.write(
+            f"Benchmarking with {options['requests']} requests per endpoint ({options['warmup']} warmup)..."
+        )
+        self.stdout.write(f"  {'endpoint':<20} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'sql ms':>8}  status")
+
+        def report(name, result):
+            self.stdout.write(
+                f"  {name:<20} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                f"{result['queries']:>8} {result['sql_ms']:>8.2f}  {','.join(map(str, result['status']))}"
+            )
+
+        try:
+            return run_benchmarks(options['requests'], options['warmup'], options['endpoint'], on_result=report)
+        except ValueError as error:
+            raise CommandError(str(error))
@@ -1,3 +1,71 @@
-from django.test import TestCase
+import json
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from unittest import mock
+from django.test import TestCase, override_settings
+from .benchmark import compare_results, percentile
 
-# Create your tests here.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MEDIA_ROOT=tempfile.mkdtemp())
+class BenchmarkTest(TestCase):
+    """Test cases for the endpoint benchmark suite"""
+
+    def result(self, p50, p95, queries):
+        return {'endpoints': {'product-list': {'p50_ms': p50, 'p95_ms': p95, 'queries': queries}}}
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_compare(self):
+        """Test latency regressions need both the threshold and the noise floor, queries any increase"""
+        baseline = self.result(10.0, 20.0, 3)
+        self.assertEqual(compare_results(baseline, self.result(11.5, 23.0, 3)), [])
+        self.assertEqual(compare_results(self.result(1.0, 1.0, 3), self.result(1.5, 1.5, 3)), [])
+        self.assertEqual(len(compare_results(baseline, self.result(13.0, 20.0, 4))), 2)
+
+    def test_command(self):
+        """Test every endpoint answers successfully and the baseline round-trips"""
+        output = f'{tempfile.mkdtemp()}/baseline.json'
+        options = {
+            'use_current_db': True, 'products': 20, 'views': 50, 'images_per_product': 0,
+            'requests': 2, 'warmup': 0, 'stdout': StringIO(),
+        }
+        with mock.patch('brokers.analytics.store_view_events') as store_view_events:
+            call_command('benchmark', output=output, **options)
+        store_view_events.assert_not_called()
+        with open(output) as file:
+            results = json.load(file)
+        self.assertEqual(results['meta']['products'], 20)
+        self.assertEqual(results['meta']['cache'], 'configured')
+        for name, result in results['endpoints'].items():
+            self.assertEqual(result['status'], [200], name)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+
+        results['endpoints']['profile-me']['queries'] = 0
+        with open(output, 'w') as file:
+            json.dump(results, file)
+        with self.assertRaisesMessage(CommandError, 'regression'):
+            call_command('benchmark', compare=output, endpoint=['profile-me'], **options)
+
+    def test_dummy_cache_measures_cold(self):
+        """Test cached endpoints still run their queries with the dummy cache"""
+        output = f'{tempfile.mkdtemp()}/baseline.json'
+        call_command(
+            'benchmark', use_current_db=True, cache='dummy', products=5, views=0, images_per_product=0,
+            requests=3, warmup=1, endpoint=['product-list'], output=output, stdout=StringIO(),
+        )
+        with open(output) as file:
+            self.assertGreater(json.load(file)['endpoints']['product-list']['queries'], 0)
+
+    def test_configured_cache_needs_current_db(self):
+        """Test the shared cache cannot be filled with a throwaway dataset"""
+        with self.assertRaisesMessage(CommandError, '--use-current-db'):
+            call_command('benchmark', cache='configured', stdout=StringIO())
@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import health_check, api_info
+from .views import health_check, health_ready, api_info, metrics
 
 app_name = 'api'
 
 urlpatterns = [
     path('', api_info, name='api_info'),
     path('health/', health_check, name='health_check'),
+    path('health/ready/', health_ready, name='health_ready'),
+    path('metrics/', metrics, name='metrics'),
 ]
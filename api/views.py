@@ -1,27 +1,46 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema
+from core.metrics import render_metrics
+from .health import get_readiness
 
 
-@extend_schema(
-    responses={200: dict},
-    tags=['General']
-)
-@api_view(['GET'])
-@permission_classes([AllowAny])
+@require_GET
 def health_check(request):
     """
-    Health check endpoint
-    
-    Returns the current health status of the API.
+    Liveness endpoint
+
+    Plain Django view that touches nothing, so it stays cheap and only
+    fails when the worker itself cannot answer. Use ``health_ready`` to
+    check dependencies.
     """
-    return Response({
+    return JsonResponse({
         'status': 'healthy',
         'message': 'API is running successfully'
     })
 
 
+@require_GET
+def health_ready(request):
+    """
+    Readiness endpoint
+
+    Database, cache and Celery broker round trips plus migration state,
+    cached for ``READINESS_CACHE_SECONDS``. Returns 503 when any check fails.
+    """
+    result = get_readiness()
+    return JsonResponse(
+        {'status': 'ready' if result['ready'] else 'not_ready', **result},
+        status=200 if result['ready'] else 503,
+    )
+
+
 @extend_schema(
     responses={200: dict},
     tags=['General']
@@ -46,5 +65,24 @@ def api_info(request):
         'endpoints': {
             'auth': '/api/auth/',
             'health': '/api/health/',
+            'ready': '/api/health/ready/',
+            'metrics': '/api/metrics/',
         }
     })
+
+
+@require_GET
+def metrics(request):
+    """
+    Prometheus metrics endpoint
+
+    Plain Django view so scrapes skip DRF authentication and throttling.
+    Requires ``Authorization: Bearer <PROMETHEUS_METRICS_TOKEN>`` when a
+    token is configured.
+    """
+    token = settings.PROMETHEUS_METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    if not settings.PROMETHEUS_METRICS_ENABLED:
+        return HttpResponse(status=404)
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
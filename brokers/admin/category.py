@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
 from django.urls import reverse
 from unfold.admin import ModelAdmin # type: ignore
@@ -59,9 +60,12 @@ class CategoryAdmin(ModelAdmin):
             obj.color
         )
     
-    @display(description='Jumlah Produk')
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('parent').annotate(total_product_count=Count('product'))
+    
+    @display(description='Jumlah Produk', ordering='total_product_count')
     def product_count(self, obj):
-        count = obj.product_set.count()
+        count = obj.total_product_count
         if count > 0:
             url = reverse('admin:brokers_product_changelist') + f'?category__id__exact={obj.id}'
             return format_html('<a href="{}">{} produk</a>', url, count)
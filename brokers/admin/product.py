@@ -1,14 +1,45 @@
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
 from django.utils.html import format_html
 from unfold.admin import ModelAdmin, TabularInline
 from unfold.decorators import display
+from ..cache import PRODUCT, bump_generation
 from ..models import Product, ProductImage, ProductView, ProductInquiry
+from ..models.product import MAX_PRODUCT_IMAGES
+from ..export import export_response
+
+
+def export_as_csv(modeladmin, request, queryset):
+    return export_response(queryset, 'csv')
+export_as_csv.short_description = "Ekspor CSV"
+
+
+def export_as_jsonl(modeladmin, request, queryset):
+    return export_response(queryset, 'jsonl')
+export_as_jsonl.short_description = "Ekspor JSON Lines"
+
+
+class ProductImageInlineFormSet(BaseInlineFormSet):
+    """Validate the image cap and a single main image across the whole inline"""
+    
+    def clean(self):
+        super().clean()
+        forms = [
+            form for form in self.forms
+            if form.cleaned_data and not form.cleaned_data.get('DELETE')
+        ]
+        if len(forms) > MAX_PRODUCT_IMAGES:
+            raise ValidationError(f'Maksimal {MAX_PRODUCT_IMAGES} gambar per produk.')
+        if sum(1 for form in forms if form.cleaned_data.get('is_main')) > 1:
+            raise ValidationError('Hanya satu gambar yang boleh menjadi gambar utama.')
 
 
 class ProductImageInline(TabularInline):
     model = ProductImage
+    formset = ProductImageInlineFormSet
     extra = 1
-    max_num = 10
+    max_num = MAX_PRODUCT_IMAGES
     fields = ['image', 'caption', 'is_main', 'order']
     ordering = ['order', '-is_main']
 
@@ -85,7 +116,10 @@ class ProductAdmin(ModelAdmin):
     ]
     
     inlines = [ProductImageInline]
-    actions = ['mark_as_sold', 'mark_as_available', 'mark_as_featured']
+    actions = ['mark_as_sold', 'mark_as_available', 'mark_as_featured', export_as_csv, export_as_jsonl]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_card_data().select_related('seller')
     
     @display(description='Gambar Utama')
     def get_main_image_preview(self, obj):
@@ -105,10 +139,6 @@ class ProductAdmin(ModelAdmin):
     def formatted_price(self, obj):
         return obj.formatted_price
     
-    @display(description='Views')
-    def view_count(self, obj):
-        return obj.views.count()
-    
     @display(description='Kontak')
     def contact_link(self, obj):
         return format_html(
@@ -118,16 +148,19 @@ class ProductAdmin(ModelAdmin):
     
     def mark_as_sold(self, request, queryset):
         queryset.update(is_sold=True, is_active=False)
+        bump_generation(PRODUCT)
         self.message_user(request, f"{queryset.count()} produk ditandai sebagai terjual.")
     mark_as_sold.short_description = "Tandai sebagai terjual"
     
     def mark_as_available(self, request, queryset):
         queryset.update(is_sold=False, is_active=True)
+        bump_generation(PRODUCT)
         self.message_user(request, f"{queryset.count()} produk ditandai sebagai tersedia.")
     mark_as_available.short_description = "Tandai sebagai tersedia"
     
     def mark_as_featured(self, request, queryset):
         queryset.update(is_featured=True)
+        bump_generation(PRODUCT)
         self.message_user(request, f"{queryset.count()} produk ditandai sebagai unggulan.")
     mark_as_featured.short_description = "Tandai sebagai produk unggulan"
 
@@ -152,6 +185,7 @@ class ProductViewAdmin(ModelAdmin):
     list_filter = ['viewed_at', 'product__category']
     search_fields = ['product__title', 'ip_address']
     readonly_fields = ['product', 'ip_address', 'user_agent', 'session_key', 'viewed_at']
+    actions = [export_as_csv, export_as_jsonl]
 
 @admin.register(ProductInquiry)
 class ProductInquiryAdmin(ModelAdmin):
@@ -160,6 +194,7 @@ class ProductInquiryAdmin(ModelAdmin):
     search_fields = ['product__title', 'inquirer_name', 'inquirer_phone', 'message']
     readonly_fields = ['created_at']
     list_editable = ['status']
+    actions = [export_as_csv, export_as_jsonl]
     
     fieldsets = [
         ('Informasi Inquiry', {
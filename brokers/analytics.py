@@ -0,0 +1,205 @@
+"""
+Buffered product analytics.
+
+Product detail requests only push a view event onto a Redis list. The
+``brokers.tasks.flush_product_views`` task drains that list in batches,
+deduplicates the events, stores new ``ProductView`` rows with
+``bulk_create(ignore_conflicts=True)`` and buffers the resulting view count
+increments in a Redis hash. ``brokers.tasks.flush_product_view_counts`` then
+applies those to ``Product.view_count`` with ``F()`` updates, so reads never
+aggregate the ``ProductView`` table and the request path never writes.
+
+When the cache is not Redis (local development, tests) events and increments
+are written to the database immediately.
+"""
+import ipaddress
+import json
+import logging
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from .models import Product, ProductView
+
+logger = logging.getLogger(__name__)
+
+VIEW_EVENTS_KEY = 'brokers:product_view_events'
+VIEW_EVENTS_LOCK_KEY = 'brokers:product_view_events:lock'
+VIEW_EVENTS_BATCH_SIZE = 5000
+VIEW_EVENTS_MAX_BATCHES = 20
+
+VIEW_COUNTS_KEY = 'brokers:product_view_counts'
+VIEW_COUNTS_FLUSHING_KEY = 'brokers:product_view_counts:flushing'
+VIEW_COUNTS_LOCK_KEY = 'brokers:product_view_counts:lock'
+
+USER_AGENT_MAX_LENGTH = 512
+
+
+def get_buffer():
+    """Redis connection backing the analytics buffers, or None without Redis"""
+    try:
+        return get_redis_connection('default')
+    except NotImplementedError:
+        return None
+
+
+def record_product_view(product_id, ip_address, session_key, user_agent=''):
+    """
+    Queue a product view event. Invalid client addresses are ignored, and
+    nothing is recorded when ``BROKERS_TRACK_PRODUCT_VIEWS`` is off.
+    """
+    if not settings.BROKERS_TRACK_PRODUCT_VIEWS:
+        return
+    try:
+        ip_address = str(ipaddress.ip_address((ip_address or '').strip()))
+    except ValueError:
+        return
+
+    event = {
+        'product_id': product_id,
+        'ip_address': ip_address,
+        'session_key': (session_key or '')[:40],
+        'user_agent': (user_agent or '')[:USER_AGENT_MAX_LENGTH],
+    }
+
+    redis = get_buffer()
+    if redis is None:
+        store_view_events([event])
+        return
+
+    try:
+        redis.rpush(VIEW_EVENTS_KEY, json.dumps(event))
+    except RedisError:
+        logger.warning('Dropping product view event: Redis unavailable', exc_info=True)
+
+
+def store_view_events(events):
+    """
+    Deduplicate view events and insert the new ones as ``ProductView`` rows.
+    Returns the number of rows created.
+    """
+    unique = {}
+    for event in events:
+        key = (event['product_id'], event['ip_address'], event['session_key'])
+        unique.setdefault(key, event)
+    if not unique:
+        return 0
+
+    product_ids = {product_id for product_id, _, _ in unique}
+    existing = set(
+        ProductView.objects.filter(
+            product_id__in=product_ids,
+            ip_address__in={ip_address for _, ip_address, _ in unique},
+        ).values_list('product_id', 'ip_address', 'session_key')
+    )
+    live_products = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+    new_views = [
+        ProductView(**event)
+        for key, event in unique.items()
+        if key not in existing and event['product_id'] in live_products
+    ]
+    ProductView.objects.bulk_create(new_views, batch_size=1000, ignore_conflicts=True)
+    increment_view_counts(Counter(view.product_id for view in new_views))
+    return len(new_views)
+
+
+def flush_view_events():
+    """
+    Drain queued view events in batches and store them. Returns the number of
+    ``ProductView`` rows created.
+
+    A batch is trimmed from the list only after it has been stored, so a
+    failed store leaves it in place for the next flush. Producers only append
+    and only the lock holder trims the head, so the trim removes exactly the
+    stored batch.
+    """
+    redis = get_buffer()
+    if redis is None:
+        return 0
+
+    lock = redis.lock(VIEW_EVENTS_LOCK_KEY, timeout=300, blocking_timeout=0)
+    if not lock.acquire():
+        return 0
+
+    created = 0
+    try:
+        for _ in range(VIEW_EVENTS_MAX_BATCHES):
+            raw_events = redis.lrange(VIEW_EVENTS_KEY, 0, VIEW_EVENTS_BATCH_SIZE - 1)
+            if not raw_events:
+                break
+            created += store_view_events([json.loads(raw) for raw in raw_events])
+            redis.ltrim(VIEW_EVENTS_KEY, len(raw_events), -1)
+            if len(raw_events) < VIEW_EVENTS_BATCH_SIZE:
+                break
+    finally:
+        lock.release()
+    return created
+
+
+def increment_view_counts(counts):
+    """Buffer view count increments, given as ``{product_id: increment}``"""
+    counts = {product_id: count for product_id, count in counts.items() if count}
+    if not counts:
+        return
+
+    redis = get_buffer()
+    if redis is None:
+        apply_view_counts(counts)
+        return
+
+    try:
+        pipeline = redis.pipeline(transaction=False)
+        for product_id, count in counts.items():
+            pipeline.hincrby(VIEW_COUNTS_KEY, product_id, count)
+        pipeline.execute()
+    except RedisError:
+        logger.warning('Dropping %d buffered view counts: Redis unavailable', len(counts), exc_info=True)
+
+
+def apply_view_counts(counts):
+    """
+    Add view count increments to products, one UPDATE per distinct increment,
+    all or none: a failed flush re-applies the whole hash
+    """
+    product_ids_by_count = defaultdict(list)
+    for product_id, count in counts.items():
+        product_ids_by_count[count].append(product_id)
+
+    with transaction.atomic():
+        for count, product_ids in product_ids_by_count.items():
+            Product.objects.filter(pk__in=product_ids).update(view_count=F('view_count') + count)
+
+
+def flush_view_counts():
+    """
+    Move buffered view counts into ``Product.view_count``.
+
+    The pending hash is renamed before it is read so increments arriving
+    during the flush land in a fresh hash. A hash left over by a crashed
+    flush is applied first. Returns the number of products updated.
+    """
+    redis = get_buffer()
+    if redis is None:
+        return 0
+
+    lock = redis.lock(VIEW_COUNTS_LOCK_KEY, timeout=300, blocking_timeout=0)
+    if not lock.acquire():
+        return 0
+
+    try:
+        if not redis.exists(VIEW_COUNTS_FLUSHING_KEY):
+            if not redis.exists(VIEW_COUNTS_KEY):
+                return 0
+            redis.rename(VIEW_COUNTS_KEY, VIEW_COUNTS_FLUSHING_KEY)
+
+        counts = {
+            int(product_id): int(count)
+            for product_id, count in redis.hgetall(VIEW_COUNTS_FLUSHING_KEY).items()
+        }
+        apply_view_counts(counts)
+        redis.delete(VIEW_COUNTS_FLUSHING_KEY)
+        return len(counts)
+    finally:
+        lock.release()
@@ -5,3 +5,6 @@ class BrokersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'brokers'
     verbose_name = 'Brokers Management'
+
+    def ready(self):
+        import brokers.signals
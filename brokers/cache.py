@@ -0,0 +1,132 @@
+"""
+Versioned response cache for public product and category reads.
+
+Every cached entity (``product``, ``category``) has a generation counter in
+the cache. Response cache keys embed the current generations of the entities a
+response depends on, plus the normalized request path and query parameters.
+Saving or deleting a product, product image or category bumps its generation
+once the transaction commits (see ``brokers.signals``), which makes every older key unreachable at once;
+stale entries are never served and simply expire.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+PRODUCT = 'product'
+CATEGORY = 'category'
+
+GENERATION_KEY = 'brokers:generation:{}'
+# Unix time of the last bump, for Last-Modified (see brokers.conditional)
+CHANGED_KEY = 'brokers:changed:{}'
+RESPONSE_KEY = 'brokers:response:{}'
+
+
+def _initial_generation():
+    # Time based, so a counter evicted from the cache never restarts at a
+    # value that older response keys were built with.
+    return time.time_ns() // 1000
+
+
+def get_generations(*entities):
+    """Current generation of each entity, initialising missing counters"""
+    keys = {entity: GENERATION_KEY.format(entity) for entity in entities}
+    found = cache.get_many(keys.values())
+    generations = {}
+    for entity, key in keys.items():
+        if key not in found:
+            cache.add(key, _initial_generation(), timeout=None)
+            found[key] = cache.get(key)
+        generations[entity] = found[key]
+    return generations
+
+
+def bump_generation(*entities):
+    """Invalidate every cached response depending on the given entities"""
+    for entity in entities:
+        key = GENERATION_KEY.format(entity)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, _initial_generation(), timeout=None)
+            cache.set(CHANGED_KEY.format(entity), time.time(), timeout=None)
+        except Exception:
+            logger.exception('Could not bump cache generation for %s', entity)
+
+
+def bump_generation_on_commit(*entities):
+    """
+    ``bump_generation`` once the current transaction commits, so a concurrent
+    read cannot cache the old rows under the new generation
+    """
+    transaction.on_commit(lambda: bump_generation(*entities))
+
+
+def get_changed_at(*entities):
+    """Unix time of the latest bump of ``entities``, or None if one is not recorded"""
+    found = cache.get_many([CHANGED_KEY.format(entity) for entity in entities])
+    if len(found) < len(entities):
+        return None
+    return max(found.values(), default=None)
+
+
+def get_request_cache_key(request, *entities, prefix='', exclude_params=()):
+    """
+    Cache key for a request given the entities its response depends on.
+    ``exclude_params`` are query parameters that do not affect the response.
+    """
+    generations = get_generations(*entities)
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        if key not in exclude_params
+        for value in values
+    )
+    parts = [
+        prefix,
+        request.get_host(),
+        request.path,
+        repr(params),
+        repr(sorted(generations.items())),
+    ]
+    digest = hashlib.sha256('|'.join(parts).encode()).hexdigest()
+    return RESPONSE_KEY.format(digest)
+
+
+def cache_response(*entities, timeout=None, exclude_params=()):
+    """
+    Cache successful response data of a viewset method, keyed by the request
+    and the generations of ``entities``. Cache outages degrade to uncached
+    responses.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            try:
+                key = get_request_cache_key(
+                    request, *entities, prefix=view_method.__qualname__, exclude_params=exclude_params
+                )
+                data = cache.get(key)
+            except Exception:
+                logger.warning('Response cache unavailable', exc_info=True)
+                return view_method(view, request, *args, **kwargs)
+
+            if data is not None:
+                return Response(data)
+
+            response = view_method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                try:
+                    cache.set(key, response.data, timeout or settings.BROKERS_RESPONSE_CACHE_TIMEOUT)
+                except Exception:
+                    logger.warning('Could not store cached response', exc_info=True)
+            return response
+        return wrapper
+    return decorator
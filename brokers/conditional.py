@@ -0,0 +1,76 @@
+"""
+Conditional GET support (ETag / Last-Modified) for read endpoints.
+
+Validators are computed from cheap aggregates (``max(updated_at)`` and row
+count) plus the response cache generations and the time they were last
+bumped, never by serializing. Requests
+carrying a matching ``If-None-Match`` or ``If-Modified-Since`` get a 304
+before the view runs its serializer.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .cache import get_changed_at, get_generations
+
+
+def compute_validators(request, values, *entities):
+    """
+    Build a strong ETag and a Last-Modified timestamp.
+
+    ``values`` are the row-level facts the representation depends on (e.g.
+    ``max(updated_at)`` and ``count``). Cache generations of ``entities`` are
+    mixed into the ETag so writes that bypass ``updated_at`` (bulk updates,
+    image edits) still change it; for the same reason Last-Modified is the
+    latest of the datetimes among ``values`` and the time of the last bump
+    of ``entities``, and is left out when that time is unknown.
+    """
+    try:
+        generations = sorted(get_generations(*entities).items())
+        changed_at = get_changed_at(*entities) if entities else None
+    except Exception:
+        generations, changed_at = [], None
+    parts = [request.get_full_path(), repr(values), repr(generations)]
+    etag = quote_etag(hashlib.sha256('|'.join(parts).encode()).hexdigest())
+    if entities and changed_at is None:
+        return etag, None
+    timestamps = [value.timestamp() for value in values if isinstance(value, datetime)]
+    if changed_at is not None:
+        timestamps.append(changed_at)
+    last_modified = int(max(timestamps)) if timestamps else None
+    return etag, last_modified
+
+
+def aggregate_validators(queryset):
+    """``(max(updated_at), count)`` of a queryset in a single query"""
+    result = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    return [result['last_modified'], result['count']]
+
+
+def conditional_response(validators):
+    """
+    Answer conditional GETs for a viewset method.
+
+    ``validators`` names a view method called with the request arguments that
+    returns ``(etag, last_modified)``, or ``(None, None)`` to skip the check
+    (e.g. when the object does not exist and the view will 404).
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            etag, last_modified = getattr(view, validators)(request, *args, **kwargs)
+            response = None
+            if etag or last_modified:
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_method(view, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                if etag:
+                    response['ETag'] = etag
+                if last_modified:
+                    response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
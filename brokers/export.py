@@ -0,0 +1,164 @@
+"""
+Streaming CSV / JSON Lines exports of products, inquiries and views.
+
+Rows are read with ``values_list().iterator(chunk_size=...)`` (a server-side
+cursor on PostgreSQL) and encoded as they arrive, so memory stays flat
+whatever the export size and the first bytes are sent right away.
+"""
+import csv
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .models import Product, ProductInquiry, ProductView
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+EXPORT_CHUNK_SIZE = 2000
+
+# Rows encoded per chunk of the response body
+ROWS_PER_WRITE = 200
+
+# Spreadsheets evaluate CSV cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    name: str
+    # (column name, values() lookup)
+    columns: tuple
+
+    @property
+    def headers(self):
+        return [column for column, _ in self.columns]
+
+    @property
+    def lookups(self):
+        return [lookup for _, lookup in self.columns]
+
+
+PRODUCTS = ExportDataset('products', (
+    ('id', 'id'),
+    ('title', 'title'),
+    ('slug', 'slug'),
+    ('category', 'category__slug'),
+    ('seller', 'seller__username'),
+    ('brand', 'brand'),
+    ('model', 'model'),
+    ('condition', 'condition'),
+    ('attributes', 'attributes'),
+    ('price', 'price'),
+    ('currency', 'currency'),
+    ('is_negotiable', 'is_negotiable'),
+    ('location_city', 'location_city'),
+    ('location_province', 'location_province'),
+    ('contact_name', 'contact_name'),
+    ('contact_phone', 'contact_phone'),
+    ('is_active', 'is_active'),
+    ('is_sold', 'is_sold'),
+    ('is_featured', 'is_featured'),
+    ('view_count', 'view_count'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+))
+
+INQUIRIES = ExportDataset('inquiries', (
+    ('id', 'id'),
+    ('product', 'product__slug'),
+    ('inquirer_name', 'inquirer_name'),
+    ('inquirer_phone', 'inquirer_phone'),
+    ('inquirer_email', 'inquirer_email'),
+    ('message', 'message'),
+    ('status', 'status'),
+    ('created_at', 'created_at'),
+))
+
+VIEWS = ExportDataset('views', (
+    ('id', 'id'),
+    ('product', 'product__slug'),
+    ('ip_address', 'ip_address'),
+    ('session_key', 'session_key'),
+    ('user_agent', 'user_agent'),
+    ('viewed_at', 'viewed_at'),
+))
+
+DATASETS = {
+    Product: PRODUCTS,
+    ProductInquiry: INQUIRIES,
+    ProductView: VIEWS,
+}
+
+
+class Echo:
+    """File-like object returning what is written, for ``csv.writer``"""
+
+    def write(self, value):
+        return value
+
+
+def encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_csv_value(value):
+    """``encode_value`` for a CSV cell: JSON for containers, formula-like text quoted with ``'``"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return encode_value(value)
+
+
+def iter_rows(queryset, dataset):
+    """Raw value tuples of a queryset, streamed from the database"""
+    queryset = queryset.select_related(None).prefetch_related(None).order_by('pk')
+    return queryset.values_list(*dataset.lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def iter_csv(rows, headers):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow([encode_csv_value(value) for value in row]))
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_jsonl(rows, headers):
+    buffer = []
+    for row in rows:
+        record = {header: encode_value(value) for header, value in zip(headers, row)}
+        buffer.append(json.dumps(record, ensure_ascii=False) + '\n')
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def export_response(queryset, export_format, dataset=None):
+    """``StreamingHttpResponse`` exporting a product, inquiry or view queryset"""
+    dataset = dataset or DATASETS[queryset.model]
+    encode = iter_csv if export_format == 'csv' else iter_jsonl
+    response = StreamingHttpResponse(
+        encode(iter_rows(queryset, dataset), dataset.headers),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    filename = f'{dataset.name}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Let reverse proxies pass chunks through instead of buffering the export
+    response['X-Accel-Buffering'] = 'no'
+    return response
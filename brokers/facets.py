@@ -0,0 +1,80 @@
+"""
+Facet counts for product listings.
+
+All facets are computed from a single grouped aggregate over the filtered
+queryset (one row per category/condition/province/currency/price bucket
+combination) and rolled up in Python, plus one query for category names.
+"""
+from collections import Counter
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+from .models import Category, Product
+
+# Upper bounds of the IDR price buckets; the last bucket is open-ended
+PRICE_BUCKET_CURRENCY = 'IDR'
+PRICE_BUCKETS = [1_000_000, 5_000_000, 10_000_000, 50_000_000, 100_000_000, 500_000_000]
+
+FACET_FIELDS = ['category_id', 'condition', 'location_province', 'currency']
+
+
+def price_bucket_expression():
+    """Index of the price bucket, or -1 for prices in other currencies"""
+    whens = [When(~Q(currency=PRICE_BUCKET_CURRENCY), then=Value(-1))]
+    whens += [When(price__lt=upper, then=Value(index)) for index, upper in enumerate(PRICE_BUCKETS)]
+    return Case(*whens, default=Value(len(PRICE_BUCKETS)), output_field=IntegerField())
+
+
+def compute_facets(queryset):
+    """Count products per category, condition, province, currency and price bucket"""
+    rows = (
+        queryset.order_by()
+        .annotate(price_bucket=price_bucket_expression())
+        .values(*FACET_FIELDS, 'price_bucket')
+        .annotate(count=Count('pk'))
+    )
+
+    counters = {field: Counter() for field in FACET_FIELDS + ['price_bucket']}
+    total = 0
+    for row in rows:
+        total += row['count']
+        for field, counter in counters.items():
+            counter[row[field]] += row['count']
+
+    categories = {
+        category['id']: category
+        for category in Category.objects.filter(pk__in=counters['category_id']).values('id', 'name', 'slug')
+    }
+    condition_labels = dict(Product.CONDITION_CHOICES)
+
+    def ranked(counter):
+        return sorted(counter.items(), key=lambda item: (-item[1], str(item[0])))
+
+    return {
+        'total': total,
+        'category': [
+            {**categories[category_id], 'count': count}
+            for category_id, count in ranked(counters['category_id'])
+            if category_id in categories
+        ],
+        'condition': [
+            {'value': value, 'label': condition_labels.get(value, value), 'count': count}
+            for value, count in ranked(counters['condition'])
+        ],
+        'location_province': [
+            {'value': value, 'count': count}
+            for value, count in ranked(counters['location_province'])
+        ],
+        'currency': [
+            {'value': value, 'count': count}
+            for value, count in ranked(counters['currency'])
+        ],
+        'price': [
+            {
+                'currency': PRICE_BUCKET_CURRENCY,
+                'min': PRICE_BUCKETS[index - 1] if index > 0 else None,
+                'max': PRICE_BUCKETS[index] if index < len(PRICE_BUCKETS) else None,
+                'count': counters['price_bucket'][index],
+            }
+            for index in range(len(PRICE_BUCKETS) + 1)
+            if counters['price_bucket'][index]
+        ],
+    }
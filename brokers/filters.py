@@ -0,0 +1,147 @@
+import re
+from django.db import connections
+from django.db.models import Q
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from .models.product import PROMOTED_ATTRIBUTES, attribute_number
+from .tree import get_category_tree
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Search backed by the product full-text index instead of OR-ed
+    ``icontains`` lookups. Annotates ``search_rank`` on the queryset.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return queryset.search(query)
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """Order search results by relevance unless the client asks otherwise"""
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if not params and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank', *(self.get_default_ordering(view) or [])]
+        return super().get_ordering(request, queryset, view)
+
+
+class ProductCategoryFilter(filters.BaseFilterBackend):
+    """
+    Filter on a category and its active descendants with ``?category=<id or
+    slug>``; several categories can be given comma separated. The subtree is
+    resolved from the cached category tree, so this is a single
+    ``category_id IN (...)`` condition.
+    """
+    category_param = 'category'
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.category_param, '').strip()
+        if not value:
+            return queryset
+
+        tree = get_category_tree()
+        category_ids = set()
+        for reference in filter(None, (part.strip() for part in value.split(','))):
+            node = tree.get(int(reference)) if reference.isdigit() else tree.get_by_slug(reference)
+            if node is None:
+                raise ValidationError({self.category_param: f'Unknown category "{reference}".'})
+            category_ids.update(tree.descendant_ids(node.id, active_only=True))
+        return queryset.filter(category_id__in=sorted(category_ids))
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.category_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Category id or slug (comma separated for several); includes subcategories.',
+                'schema': {'type': 'string'},
+            },
+        ]
+
+
+class ProductAttributeFilter(filters.BaseFilterBackend):
+    """
+    Filter on ``Product.attributes`` keys with ``attr.<key>[__<lookup>]=value``
+    query params, e.g. ``?attr.tahun__gte=2020&attr.warna=Merah``.
+
+    Keys in ``PROMOTED_ATTRIBUTES`` use their indexed generated columns.
+    Other keys use JSON containment on PostgreSQL (backed by the
+    ``jsonb_path_ops`` GIN index) and key lookups elsewhere.
+    """
+    param_prefix = 'attr.'
+    key_re = re.compile(r'^[a-z0-9_]{1,50}$')
+    lookups = ['exact', 'iexact', 'in', 'gt', 'gte', 'lt', 'lte']
+    numeric_lookups = ['gt', 'gte', 'lt', 'lte']
+
+    def filter_queryset(self, request, queryset, view):
+        for param, values in request.query_params.lists():
+            if not param.startswith(self.param_prefix):
+                continue
+            key, _, lookup = param[len(self.param_prefix):].partition('__')
+            lookup = lookup or 'exact'
+            if not self.key_re.match(key) or lookup not in self.lookups:
+                raise ValidationError({param: 'Unsupported attribute filter.'})
+            for value in values:
+                queryset = self.filter_attribute(queryset, param, key, lookup, value)
+        return queryset
+
+    def filter_attribute(self, queryset, param, key, lookup, value):
+        if lookup in self.numeric_lookups:
+            number = self.parse_number(param, value)
+            if key in PROMOTED_ATTRIBUTES:
+                return queryset.filter(**{f'{PROMOTED_ATTRIBUTES[key]}__{lookup}': number})
+            alias = f'attr_value_{key}'
+            return queryset.alias(**{alias: attribute_number(key)}).filter(**{f'{alias}__{lookup}': number})
+
+        if lookup == 'iexact':
+            return queryset.filter(**{f'attributes__{key}__iexact': value})
+
+        choices = [choice.strip() for choice in value.split(',')] if lookup == 'in' else [value]
+        condition = Q()
+        for choice in choices:
+            condition |= self.exact_condition(queryset, key, choice)
+        return queryset.filter(condition)
+
+    def exact_condition(self, queryset, key, value):
+        if key in PROMOTED_ATTRIBUTES and value.isdigit():
+            return Q(**{PROMOTED_ATTRIBUTES[key]: int(value)})
+
+        # Attributes hold strings ("2020") as well as numbers (2020)
+        candidates = [value]
+        if value.lstrip('-').isdigit():
+            candidates.append(int(value))
+        condition = Q()
+        for candidate in candidates:
+            if connections[queryset.db].vendor == 'postgresql':
+                condition |= Q(attributes__contains={key: candidate})
+            else:
+                # Explicit __exact: a bare final part named like a JSONField
+                # lookup (contains, isnull, ...) would be applied as that lookup
+                condition |= Q(**{f'attributes__{key}__exact': candidate})
+        return condition
+
+    def parse_number(self, param, value):
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({param: 'Expected an integer.'})
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': f'{self.param_prefix}{{key}}',
+                'required': False,
+                'in': 'query',
+                'description': (
+                    'Filter on a product attribute, optionally with a lookup suffix '
+                    '(__gte, __lte, __gt, __lt, __in, __iexact), e.g. attr.tahun__gte=2020.'
+                ),
+                'schema': {'type': 'string'},
+            },
+        ]
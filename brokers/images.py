@@ -0,0 +1,113 @@
+"""
+Batched product image writes.
+
+``attach_images`` adds several uploaded images to a product with a fixed
+number of queries: the 10-image cap and the main image are resolved from one
+query over the existing images, the files are written to storage
+concurrently and the rows are inserted with one ``bulk_create``. Files are
+released again if the insert fails. Resized variants are queued once the
+transaction commits (see ``brokers.variants``).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.db import transaction
+from .cache import PRODUCT, bump_generation_on_commit
+from .models import ProductImage
+from .models.product import MAX_PRODUCT_IMAGES
+from .storage import claim_blob, lock_blob
+from .tasks import queue_image_variants
+
+# Concurrent storage writes per request
+IMAGE_WRITE_WORKERS = 4
+
+
+def image_slots(product):
+    """``(existing count, next order, has main image)`` of a product in one query"""
+    existing = list(product.images.values_list('order', 'is_main')) if product.pk else []
+    next_order = max((order for order, _ in existing), default=-1) + 1
+    return len(existing), next_order, any(is_main for _, is_main in existing)
+
+
+def save_image_files(images):
+    """
+    Read the size of unsaved ``ProductImage`` instances and write their
+    files, concurrently
+    """
+    def save(image):
+        field = image.image
+        image.set_metadata(field.file)
+        name = field.field.generate_filename(image, field.name)
+        field.name = field.storage.save(name, field.file, max_length=field.field.max_length)
+        field._committed = True
+        return field.name
+
+    if len(images) == 1:
+        return [save(images[0])]
+    with ThreadPoolExecutor(max_workers=min(IMAGE_WRITE_WORKERS, len(images))) as executor:
+        return list(executor.map(save, images))
+
+
+def attach_images(product, files, main_first=True):
+    """
+    Add uploaded ``files`` to ``product``, in order. The first new image
+    becomes the main image if the product has none (``main_first``).
+    Raises ``ValueError`` when the result would exceed the image cap.
+    """
+    if not files:
+        return []
+
+    count, next_order, has_main = image_slots(product)
+    if count + len(files) > MAX_PRODUCT_IMAGES:
+        raise ValueError(f"Maksimal {MAX_PRODUCT_IMAGES} gambar per produk")
+
+    images = [
+        ProductImage(
+            product=product,
+            image=file,
+            order=next_order + index,
+            is_main=main_first and not has_main and index == 0,
+        )
+        for index, file in enumerate(files)
+    ]
+    names = save_image_files(images)
+    try:
+        with transaction.atomic():
+            ProductImage.objects.bulk_create(images)
+            for image, file in zip(images, files):
+                claim_blob(image.image.storage, image.image.name, file)
+    except Exception:
+        # Blobs are shared (see brokers.storage): only unreferenced ones go
+        for name in dict.fromkeys(names):
+            release_image(name)
+        raise
+
+    # bulk_create sends no post_save, so invalidate cached product reads and
+    # queue the variants here
+    bump_generation_on_commit(PRODUCT)
+    transaction.on_commit(lambda: queue_image_variants([image.pk for image in images]))
+    return images
+
+
+def release_image(name, variants=None):
+    """
+    Delete an image blob and its variant files once no ``ProductImage`` row
+    references it any more. Blobs are shared between rows with identical
+    content (see ``brokers.storage``), so the row count is the reference count.
+    The count is rechecked under ``lock_blob`` so a concurrent upload either
+    sees the blob deleted and writes it again or is counted here.
+    """
+    if not name:
+        return False
+    storage = ProductImage._meta.get_field('image').storage
+    names = [name] + [
+        value
+        for variant in (variants or {}).values()
+        for extension, value in variant.items()
+        if isinstance(value, str)
+    ]
+    with transaction.atomic():
+        lock_blob(name)
+        if ProductImage.objects.filter(image=name).exists():
+            return False
+        for blob in names:
+            storage.delete(blob)
+    return True
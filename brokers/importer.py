@@ -0,0 +1,201 @@
+"""
+Bulk product import from CSV or JSON Lines.
+
+Input is parsed as a stream, one record at a time, and processed in chunks:
+each row is validated with ``ProductImportSerializer``, slugs for the whole
+chunk are allocated with ``Product.allocate_slugs`` and the valid rows are
+inserted with one ``bulk_create`` per chunk, in its own transaction. After
+every chunk the caller gets the running result, whose ``last_row`` is the
+checkpoint to resume from. Invalid rows are reported with their row number
+and do not stop the import.
+
+Used by the ``import_products`` management command and the
+``products/bulk_import/`` endpoint.
+"""
+import csv
+import io
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+from .cache import PRODUCT, bump_generation_on_commit
+from .models import Product
+from .serializers import ProductImportSerializer
+from .tree import get_category_tree
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ['csv', 'jsonl']
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000
+
+# CSV columns named "attr.<key>" become Product.attributes keys
+ATTRIBUTE_COLUMN_PREFIX = 'attr.'
+
+
+def detect_format(name):
+    """Import format from a file name, or None"""
+    name = (name or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def read_records(stream, import_format):
+    """
+    Yield ``(row, record)`` from a binary or text stream, ``row`` counting
+    data rows from 1. Rows that cannot be parsed yield a ``ValueError``
+    instead of a record.
+    """
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if import_format == 'csv':
+        for row, record in enumerate(csv.DictReader(stream), 1):
+            yield row, parse_csv_record(record)
+    elif import_format == 'jsonl':
+        row = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield row, ValueError(f'Invalid JSON: {error}')
+                continue
+            yield row, record if isinstance(record, dict) else ValueError('Expected a JSON object.')
+    else:
+        raise ValueError(f'Unsupported import format: {import_format}')
+
+
+def parse_csv_record(record):
+    """Drop empty cells and collect attributes from ``attributes``/``attr.<key>`` columns"""
+    if None in record:
+        return ValueError('Row has more cells than the header.')
+    attributes = {}
+    if record.get('attributes'):
+        try:
+            attributes = json.loads(record.pop('attributes'))
+        except ValueError as error:
+            return ValueError(f'Invalid attributes JSON: {error}')
+    parsed = {}
+    for column, value in record.items():
+        if value in ('', None):
+            continue
+        if column.startswith(ATTRIBUTE_COLUMN_PREFIX):
+            attributes[column[len(ATTRIBUTE_COLUMN_PREFIX):]] = value
+        else:
+            parsed[column] = value
+    if attributes:
+        parsed['attributes'] = attributes
+    return parsed
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    failed: int = 0
+    last_row: int = 0
+    errors: list = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def duration(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self):
+        return round((self.created + self.failed) / self.duration, 1) if self.duration else 0.0
+
+    def add_error(self, row, errors, max_errors=IMPORT_MAX_ERRORS):
+        self.failed += 1
+        if len(self.errors) < max_errors:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'last_row': self.last_row,
+            'duration': round(self.duration, 3),
+            'rows_per_second': self.rows_per_second,
+            'errors': self.errors,
+        }
+
+
+class ProductImporter:
+    """Insert products for ``seller`` from ``(row, record)`` pairs (see ``read_records``)"""
+
+    def __init__(self, seller, chunk_size=IMPORT_CHUNK_SIZE, max_errors=IMPORT_MAX_ERRORS):
+        self.seller = seller
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        # One serializer instance validates every row, so fields are built once
+        self.serializer = ProductImportSerializer(context={'category_tree': get_category_tree()})
+
+    def run(self, records, resume_after=0, on_chunk=None):
+        """
+        Import all records after row ``resume_after``. ``on_chunk(result)``
+        is called after each committed chunk.
+        """
+        result = ImportResult(last_row=resume_after)
+        records = ((row, record) for row, record in records if row > resume_after)
+        while chunk := list(islice(records, self.chunk_size)):
+            self.import_chunk(chunk, result)
+            result.last_row = chunk[-1][0]
+            if on_chunk:
+                on_chunk(result)
+        return result
+
+    def import_chunk(self, chunk, result):
+        rows, products = [], []
+        for row, record in chunk:
+            product = self.build(row, record, result)
+            if product is not None:
+                rows.append(row)
+                products.append(product)
+        if not products:
+            return
+
+        try:
+            self.insert(products)
+        except IntegrityError:
+            # A concurrent insert took one of the slugs: insert row by row so
+            # Product.save can allocate again, reporting rows that still fail
+            for row, product in zip(rows, products):
+                product.pk, product.slug = None, ''
+                try:
+                    product.save()
+                except IntegrityError as error:
+                    result.add_error(row, {'non_field_errors': [str(error)]}, self.max_errors)
+                else:
+                    result.created += 1
+        else:
+            result.created += len(products)
+        bump_generation_on_commit(PRODUCT)
+
+    def build(self, row, record, result):
+        """Validate a record into an unsaved Product, or report its errors"""
+        if isinstance(record, Exception):
+            result.add_error(row, {'non_field_errors': [str(record)]}, self.max_errors)
+            return None
+        try:
+            data = self.serializer.run_validation(record)
+        except ValidationError as error:
+            result.add_error(row, error.detail, self.max_errors)
+            return None
+        data['category_id'] = data.pop('category')
+        return Product(seller=self.seller, **data)
+
+    def insert(self, products):
+        slugs = Product.allocate_slugs([Product.base_slug(product.title) for product in products])
+        for product, slug in zip(products, slugs):
+            product.slug = slug
+        with transaction.atomic():
+            Product.objects.bulk_create(products, batch_size=500)
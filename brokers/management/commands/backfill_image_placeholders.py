@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from django.core.management.base import BaseCommand
+from brokers.cache import PRODUCT, bump_generation
+from brokers.models import ProductImage
+from brokers.placeholders import read_image_metadata
+
+
+def read_metadata(image):
+    """Read size and placeholder of a stored image; missing files are skipped"""
+    storage = image.image.storage
+    if not image.image or not storage.exists(image.image.name):
+        return image, False
+    with storage.open(image.image.name, 'rb') as file:
+        image.width, image.height, image.placeholder = read_image_metadata(file)
+    return image, image.width is not None
+
+
+class Command(BaseCommand):
+    help = 'Store size and placeholder for product images uploaded before they were computed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Number of threads reading images from storage (default: 8)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Rows written per UPDATE batch (default: 500)'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Recompute every image, not only those without a size'
+        )
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.only('id', 'image').order_by('pk')
+        if not options['all']:
+            images = images.filter(width__isnull=True)
+        batch_size = options['batch_size']
+
+        done = skipped = 0
+        self.stdout.write('Computing image sizes and placeholders...')
+        rows = images.iterator(chunk_size=batch_size)
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            while batch := list(islice(rows, batch_size)):
+                updated = []
+                for image, ok in executor.map(read_metadata, batch):
+                    if ok:
+                        updated.append(image)
+                    else:
+                        skipped += 1
+                        self.stdout.write(self.style.WARNING(f'→ Skipped image {image.pk}: {image.image.name}'))
+                ProductImage.objects.bulk_update(updated, ['width', 'height', 'placeholder'])
+                done += len(updated)
+
+        if done:
+            bump_generation(PRODUCT)
+        self.stdout.write(self.style.SUCCESS(f'✓ Updated {done} images ({skipped} skipped)'))
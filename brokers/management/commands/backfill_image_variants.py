@@ -0,0 +1,55 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+from functools import partial
+from django.core.management.base import BaseCommand
+from django.db import connections
+from brokers.models import ProductImage
+from brokers.variants import VARIANT_SIZES, update_image_variants
+
+
+def generate(image_id, reuse=True):
+    """Worker entry point: one image, using the worker's own DB connection"""
+    return image_id, update_image_variants(image_id, reuse=reuse)
+
+
+class Command(BaseCommand):
+    help = 'Generate resized variants for product images that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Number of worker processes (default: number of CPUs)'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerate variants for every image, not only missing ones'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Process at most this many images'
+        )
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.order_by('pk')
+        if not options['all']:
+            images = images.exclude(variants__has_key=next(iter(VARIANT_SIZES)))
+        image_ids = list(images.values_list('pk', flat=True)[:options['limit']])
+        if not image_ids:
+            self.stdout.write('No images need variants.')
+            return
+
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Generating variants for {len(image_ids)} images with {workers} workers...')
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for image_id, generated in executor.map(partial(generate, reuse=not options['all']), image_ids, chunksize=16):
+                if generated:
+                    done += 1
+                else:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'→ Skipped image {image_id}'))
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Generated variants for {done} images ({failed} skipped)'))
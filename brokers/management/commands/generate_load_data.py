@@ -0,0 +1,321 @@
+import ipaddress
+import os
+import random
+import time
+import uuid
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from itertools import accumulate
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.text import slugify
+from PIL import Image
+from brokers.cache import PRODUCT, bump_generation
+from brokers.models import Category, Product, ProductImage, ProductView
+from brokers.placeholders import read_image_metadata
+from brokers.storage import content_addressed_name, content_hash
+from brokers.tree import invalidate_category_tree
+
+User = get_user_model()
+
+ROOT_CATEGORIES = ['Mobil', 'Motor', 'Elektronik', 'Properti', 'Furniture', 'Hobi', 'Fashion', 'Truk']
+
+# (province, weight, cities), roughly following listing volume
+PROVINCES = [
+    ('Jawa Barat', 20, ['Bandung', 'Bekasi', 'Bogor', 'Depok']),
+    ('DKI Jakarta', 18, ['Jakarta Selatan', 'Jakarta Barat', 'Jakarta Timur']),
+    ('Jawa Timur', 14, ['Surabaya', 'Malang', 'Sidoarjo']),
+    ('Jawa Tengah', 11, ['Semarang', 'Solo']),
+    ('Banten', 7, ['Tangerang', 'Serang']),
+    ('Sumatera Utara', 5, ['Medan']),
+    ('Bali', 4, ['Denpasar']),
+    ('DI Yogyakarta', 4, ['Yogyakarta', 'Sleman']),
+    ('Sulawesi Selatan', 3, ['Makassar']),
+    ('Riau', 2, ['Pekanbaru']),
+    ('Sumatera Selatan', 2, ['Palembang']),
+    ('Kalimantan Timur', 2, ['Balikpapan', 'Samarinda']),
+    ('Lampung', 2, ['Bandar Lampung']),
+    ('Kalimantan Barat', 1, ['Pontianak']),
+    ('Papua', 1, ['Jayapura']),
+]
+
+BRANDS = {
+    'Honda': ['Beat', 'Vario', 'Scoopy', 'PCX', 'Brio', 'Jazz', 'Civic', 'HR-V'],
+    'Yamaha': ['NMAX', 'Aerox', 'Mio', 'R15', 'XMAX'],
+    'Toyota': ['Avanza', 'Innova', 'Fortuner', 'Yaris', 'Rush'],
+    'Suzuki': ['Ertiga', 'Satria', 'Nex', 'Carry'],
+    'Daihatsu': ['Xenia', 'Ayla', 'Sigra', 'Gran Max'],
+    'Samsung': ['Galaxy S23', 'Galaxy A54', 'Smart TV 55'],
+    'Apple': ['iPhone 13', 'iPhone 14', 'MacBook Air'],
+    'IKEA': ['KIVIK', 'MALM', 'HEMNES'],
+}
+CONDITIONS = [('new', 10), ('like_new', 20), ('good', 45), ('fair', 20), ('poor', 5)]
+COLORS = ['Hitam', 'Putih', 'Merah', 'Silver', 'Abu-abu', 'Biru']
+CC_CHOICES = [110, 125, 150, 155, 250, 1200, 1300, 1500, 2000, 2400]
+
+# Shared placeholder photos: images are rows pointing at these few blobs
+SAMPLE_IMAGE_COUNT = 12
+
+# Generated views are spread over the last days and pre-date this run
+VIEW_PERIOD = timedelta(days=90)
+PRODUCT_PERIOD = timedelta(days=730)
+
+# Set in the parent before the worker pool forks
+_state = {}
+
+
+def weighted(weights):
+    """Cumulative weights for ``choose``"""
+    return list(accumulate(weights))
+
+
+def choose(rng, population, cumulative):
+    return population[bisect(cumulative, rng.random() * cumulative[-1])]
+
+
+def zipf_weights(count, exponent=1.1):
+    """Skewed weights: the first items are by far the most popular"""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep generated values for auto_now/auto_now_add fields"""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def product_rows(rng, start, count):
+    state = _state
+    now = timezone.now()
+    brands = list(BRANDS)
+    for index in range(start, start + count):
+        brand = brands[bisect(state['brand_weights'], rng.random() * state['brand_weights'][-1])]
+        model = rng.choice(BRANDS[brand])
+        year = min(2025, int(rng.triangular(2005, 2026, 2022)))
+        province, cities = choose(rng, state['provinces'], state['province_weights'])
+        title = f'{brand} {model} {year}'
+        created_at = now - PRODUCT_PERIOD * (rng.random() ** 2)
+        attributes = {'tahun': year, 'warna': rng.choice(COLORS)}
+        if rng.random() < 0.6:
+            attributes['cc'] = rng.choice(CC_CHOICES)
+            attributes['km'] = int(rng.expovariate(1 / 30000))
+        yield Product(
+            title=title,
+            slug=f"{slugify(title)}-{state['run']}-{index}",
+            category_id=choose(rng, state['category_ids'], state['category_weights']),
+            seller_id=rng.choice(state['seller_ids']),
+            brand=brand,
+            model=model,
+            condition=choose(rng, *state['conditions']),
+            attributes=attributes,
+            location_city=rng.choice(cities),
+            location_province=province,
+            price=Decimal(int(rng.lognormvariate(17, 1.3)) // 1000 * 1000 + 100_000),
+            is_negotiable=rng.random() < 0.7,
+            contact_name='Load Test',
+            contact_phone=f'08{rng.randrange(10**9, 10**10)}',
+            description=f'{title} kondisi {rng.choice(["terawat", "mulus", "siap pakai", "istimewa"])}, '
+                        f'lokasi {province}. Surat lengkap, harga {rng.choice(["nego", "pas"])}.',
+            is_featured=rng.random() < 0.02,
+            is_sold=rng.random() < 0.1,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+
+def create_products(task):
+    """Worker: insert ``count`` products (and their images) starting at ``start``"""
+    start, count = task
+    state = _state
+    rng = random.Random(f"{state['seed']}:products:{start}")
+    products = list(product_rows(rng, start, count))
+    with explicit_timestamps(Product._meta.get_field('created_at'), Product._meta.get_field('updated_at')):
+        Product.objects.bulk_create(products, batch_size=state['batch_size'])
+
+    images = []
+    for product in products:
+        for order in range(rng.randint(max(0, state['images_per_product'] - 2), state['images_per_product'])):
+            name, width, height, placeholder = rng.choice(state['images'])
+            images.append(ProductImage(
+                product_id=product.pk, image=name, order=order, is_main=order == 0,
+                width=width, height=height, placeholder=placeholder,
+            ))
+    ProductImage.objects.bulk_create(images, batch_size=state['batch_size'])
+    return count
+
+
+def create_views(task):
+    """Worker: insert ``count`` views starting at ``start``, unique by construction"""
+    start, count = task
+    state = _state
+    rng = random.Random(f"{state['seed']}:views:{start}")
+    now = timezone.now()
+    product_ids = state['product_ids']
+    views = [
+        ProductView(
+            product_id=product_ids[int(len(product_ids) * rng.random() ** 3)],
+            ip_address=str(ipaddress.IPv4Address(0x0A000000 + index % 2**24)),
+            session_key=f"{state['run']}-{index // 2**24}",
+            user_agent='Mozilla/5.0 (Linux; Android 13) load-test',
+            viewed_at=now - VIEW_PERIOD * rng.random(),
+        )
+        for index in range(start, start + count)
+    ]
+    with explicit_timestamps(ProductView._meta.get_field('viewed_at')):
+        ProductView.objects.bulk_create(views, batch_size=state['batch_size'])
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic dataset (categories, products, images, views) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Number of products')
+        parser.add_argument('--categories-depth', type=int, default=2, help='Levels of the category tree')
+        parser.add_argument('--categories-per-level', type=int, default=5, help='Children per category')
+        parser.add_argument('--images-per-product', type=int, default=0, help='Maximum images per product')
+        parser.add_argument('--views', type=int, default=0, help='Number of product views')
+        parser.add_argument('--sellers', type=int, default=200, help='Number of seller accounts')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for reproducible datasets')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk INSERT')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Worker processes (always 1 on SQLite)'
+        )
+
+    def handle(self, *args, **options):
+        if options['categories_depth'] < 1:
+            raise CommandError('--categories-depth must be at least 1.')
+        workers = max(1, options['workers'])
+        if connection.vendor == 'sqlite' and workers > 1:
+            self.stdout.write('→ SQLite allows one writer at a time, using 1 worker')
+            workers = 1
+
+        rng = random.Random(options['seed'])
+        _state.update(
+            seed=options['seed'],
+            # Fresh per run, so repeated runs add rows instead of colliding on slugs
+            run=uuid.uuid4().hex[:6],
+            batch_size=options['batch_size'],
+            images_per_product=options['images_per_product'],
+            brand_weights=weighted(zipf_weights(len(BRANDS), 0.8)),
+            provinces=[(province, cities) for province, _, cities in PROVINCES],
+            province_weights=weighted(weight for _, weight, _ in PROVINCES),
+            conditions=([value for value, _ in CONDITIONS], weighted(weight for _, weight in CONDITIONS)),
+        )
+
+        self.create_sellers(options['sellers'])
+        self.create_categories(rng, options['categories_depth'], options['categories_per_level'])
+        if options['images_per_product']:
+            self.create_sample_images(rng)
+
+        first_id = (Product.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        self.run('products', create_products, options['products'], workers)
+        if options['views']:
+            _state['product_ids'] = list(Product.objects.filter(pk__gte=first_id).values_list('pk', flat=True))
+            if not _state['product_ids']:
+                raise CommandError('Views need products, use --products.')
+            self.run('views', create_views, options['views'], workers)
+            self.update_view_counts(first_id)
+
+        bump_generation(PRODUCT)
+        # Also drops this process's tree, which may be served without a generation check
+        invalidate_category_tree()
+        self.stdout.write(self.style.SUCCESS('🎉 Load data generated'))
+
+    def run(self, label, worker, total, workers):
+        """Run ``worker`` over ``total`` rows in batch-sized tasks, forking if needed"""
+        batch_size = _state['batch_size']
+        tasks = [(start, min(batch_size, total - start)) for start in range(0, total, batch_size)]
+        started = time.monotonic()
+        done = 0
+
+        def report(count):
+            nonlocal done
+            done += count
+            rate = done / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f'  {label}: {done}/{total} ({rate:,.0f} rows/s)')
+
+        self.stdout.write(f'Creating {total} {label} with {workers} worker(s)...')
+        if workers == 1:
+            for task in tasks:
+                report(worker(task))
+            return
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for count in executor.map(worker, tasks):
+                report(count)
+
+    def create_sellers(self, count):
+        prefix = f"load-{_state['run']}-"
+        User.objects.bulk_create(
+            [User(username=f'{prefix}{index}', password='!') for index in range(count)],
+            batch_size=_state['batch_size'],
+            ignore_conflicts=True,
+        )
+        _state['seller_ids'] = list(User.objects.filter(username__startswith=prefix).values_list('pk', flat=True))
+        self.stdout.write(f'✓ {len(_state["seller_ids"])} sellers')
+
+    def create_categories(self, rng, depth, per_level):
+        """Category tree; products go to leaves with a skewed distribution"""
+        level = []
+        for index, name in enumerate(ROOT_CATEGORIES[:per_level] or ROOT_CATEGORIES[:1]):
+            category, _ = Category.objects.get_or_create(name=f'{name} Load', defaults={'sort_order': index})
+            level.append(category)
+        for _ in range(depth - 1):
+            children = []
+            for parent in level:
+                for index in range(1, per_level + 1):
+                    category, _ = Category.objects.get_or_create(
+                        name=f'{parent.name} {index}'[:100], defaults={'parent': parent, 'sort_order': index}
+                    )
+                    children.append(category)
+            level = children
+
+        category_ids = [category.pk for category in level]
+        rng.shuffle(category_ids)
+        _state['category_ids'] = category_ids
+        _state['category_weights'] = weighted(zipf_weights(len(category_ids)))
+        self.stdout.write(f'✓ {len(category_ids)} leaf categories, {depth} levels')
+
+    def create_sample_images(self, rng):
+        """A few real image blobs shared by every generated ProductImage"""
+        storage = ProductImage._meta.get_field('image').storage
+        images = []
+        for _ in range(SAMPLE_IMAGE_COUNT):
+            buffer = BytesIO()
+            color = tuple(rng.randrange(256) for _ in range(3))
+            Image.new('RGB', (1200, 900), color).save(buffer, format='JPEG', quality=80)
+            content = ContentFile(buffer.getvalue())
+            name = storage.save(content_addressed_name('products', content_hash(content), 'jpg'), content)
+            images.append((name, *read_image_metadata(content)))
+        _state['images'] = images
+        self.stdout.write(f'✓ {len(images)} sample images')
+
+    def update_view_counts(self, first_id):
+        counts = (
+            ProductView.objects.filter(product=OuterRef('pk'))
+            .order_by()
+            .values('product')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        Product.objects.filter(pk__gte=first_id).update(view_count=Coalesce(Subquery(counts), 0))
+        self.stdout.write('✓ View counts updated')
@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from brokers.importer import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, ProductImporter, detect_format, read_records
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file, or - for stdin')
+        parser.add_argument('--seller', required=True, help='Username of the seller owning the products')
+        parser.add_argument('--import-format', choices=IMPORT_FORMATS, help='Input format (default: from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows per transaction')
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording the last imported row; an existing checkpoint for the same input is resumed'
+        )
+        parser.add_argument('--resume-after', type=int, default=0, help='Skip rows up to and including this row')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        import_format = options['import_format'] or detect_format(path)
+        if import_format is None:
+            raise CommandError('Cannot detect the input format, use --import-format.')
+        try:
+            seller = User.objects.get(username=options['seller'])
+        except User.DoesNotExist:
+            raise CommandError(f'Unknown seller: {options["seller"]}')
+
+        checkpoint = options['checkpoint']
+        resume_after = options['resume_after'] or self.read_checkpoint(checkpoint, path)
+        if resume_after:
+            self.stdout.write(f'→ Resuming after row {resume_after}')
+
+        reported = 0
+
+        def on_chunk(result):
+            nonlocal reported
+            for error in result.errors[reported:]:
+                self.stderr.write(f'Row {error["row"]}: {json.dumps(error["errors"], ensure_ascii=False)}')
+            reported = len(result.errors)
+            if checkpoint:
+                self.write_checkpoint(checkpoint, path, result.last_row)
+            self.stdout.write(
+                f'Row {result.last_row}: {result.created} created, {result.failed} failed '
+                f'({result.rows_per_second} rows/s)'
+            )
+
+        importer = ProductImporter(seller, chunk_size=options['chunk_size'])
+        if path == '-':
+            result = importer.run(read_records(sys.stdin.buffer, import_format), resume_after, on_chunk)
+        else:
+            with open(path, 'rb') as stream:
+                result = importer.run(read_records(stream, import_format), resume_after, on_chunk)
+
+        if result.failed > reported:
+            self.stderr.write(f'... {result.failed - reported} more failed rows not shown')
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Imported {result.created} products ({result.failed} failed) in {result.duration:.1f}s'
+        ))
+
+    def read_checkpoint(self, checkpoint, path):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as file:
+            state = json.load(file)
+        return state['last_row'] if state.get('path') == os.path.abspath(path) else 0
+
+    def write_checkpoint(self, checkpoint, path, last_row):
+        temporary = f'{checkpoint}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({'path': os.path.abspath(path), 'last_row': last_row}, file)
+        os.replace(temporary, checkpoint)
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-17 05:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("brokers", "0002_product_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["-is_featured", "-created_at", "-id"],
+                name="product_listing_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["seller", "-created_at", "-id"],
+                name="product_seller_listing_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_view_count(apps, schema_editor):
+    Product = apps.get_model("brokers", "Product")
+    ProductView = apps.get_model("brokers", "ProductView")
+    counts = (
+        ProductView.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Product.objects.update(view_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("brokers", "0003_product_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="view_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Jumlah View"
+            ),
+        ),
+        migrations.RunPython(backfill_view_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:06
+
+import django.db.models.fields.json
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+def create_attributes_index(apps, schema_editor):
+    # jsonb_path_ops GIN index for @> containment filters (PostgreSQL only)
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS brokers_product_attributes_gin "
+            "ON brokers_product USING gin (attributes jsonb_path_ops)"
+        )
+
+
+def drop_attributes_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS brokers_product_attributes_gin")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("brokers", "0004_product_view_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="attr_cc",
+            field=models.GeneratedField(
+                db_index=True,
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        models.Q(("attributes__cc__regex", "^[0-9]{1,9}$")),
+                        then=django.db.models.functions.comparison.Cast(
+                            django.db.models.fields.json.KeyTextTransform(
+                                "cc", "attributes"
+                            ),
+                            models.IntegerField(),
+                        ),
+                    ),
+                    default=None,
+                    output_field=models.IntegerField(),
+                ),
+                output_field=models.IntegerField(),
+                verbose_name="CC",
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="attr_km",
+            field=models.GeneratedField(
+                db_index=True,
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        models.Q(("attributes__km__regex", "^[0-9]{1,9}$")),
+                        then=django.db.models.functions.comparison.Cast(
+                            django.db.models.fields.json.KeyTextTransform(
+                                "km", "attributes"
+                            ),
+                            models.IntegerField(),
+                        ),
+                    ),
+                    default=None,
+                    output_field=models.IntegerField(),
+                ),
+                output_field=models.IntegerField(),
+                verbose_name="Kilometer",
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="attr_tahun",
+            field=models.GeneratedField(
+                db_index=True,
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        models.Q(("attributes__tahun__regex", "^[0-9]{1,9}$")),
+                        then=django.db.models.functions.comparison.Cast(
+                            django.db.models.fields.json.KeyTextTransform(
+                                "tahun", "attributes"
+                            ),
+                            models.IntegerField(),
+                        ),
+                    ),
+                    default=None,
+                    output_field=models.IntegerField(),
+                ),
+                output_field=models.IntegerField(),
+                verbose_name="Tahun",
+            ),
+        ),
+        migrations.RunPython(create_attributes_index, drop_attributes_index),
+    ]
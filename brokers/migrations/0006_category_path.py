@@ -0,0 +1,49 @@
+# Generated by Django 5.1.3 on 2026-10-17 08:00
+
+from django.db import migrations, models
+
+
+def backfill_category_paths(apps, schema_editor):
+    Category = apps.get_model("brokers", "Category")
+    parents = dict(Category.objects.values_list("pk", "parent_id"))
+
+    def ancestry(pk):
+        chain = []
+        while pk is not None and pk not in chain:
+            chain.append(pk)
+            pk = parents.get(pk)
+        return chain[::-1]
+
+    categories = []
+    for pk in parents:
+        chain = ancestry(pk)
+        categories.append(
+            Category(
+                pk=pk,
+                path="/" + "".join(f"{ancestor}/" for ancestor in chain),
+                depth=len(chain) - 1,
+            )
+        )
+    Category.objects.bulk_update(categories, ["path", "depth"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("brokers", "0005_product_attribute_columns"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_category_paths, migrations.RunPython.noop),
+    ]
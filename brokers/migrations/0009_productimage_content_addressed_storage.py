@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:22
+
+import brokers.models.product
+import brokers.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("brokers", "0008_productimage_placeholder"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="productimage",
+            name="image",
+            field=models.ImageField(
+                storage=brokers.storage.get_product_image_storage,
+                upload_to=brokers.models.product.upload_product_image,
+                verbose_name="Gambar",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:24
+
+import brokers.models.product
+import brokers.storage
+import core.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("brokers", "0009_productimage_content_addressed_storage"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="productimage",
+            name="image",
+            field=models.ImageField(
+                storage=brokers.storage.get_product_image_storage,
+                upload_to=brokers.models.product.upload_product_image,
+                validators=[core.uploads.ImageUploadValidator()],
+                verbose_name="Gambar",
+            ),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Concat, Substr
 from django.utils.text import slugify
 import uuid
 import os
@@ -11,6 +14,16 @@ def upload_category_image(instance, filename):
     return os.path.join('categories', filename)
 
 
+class CategoryQuerySet(models.QuerySet):
+    """Query helpers shared by the category endpoints"""
+
+    def with_product_count(self):
+        """Annotate ``live_product_count``: active, unsold products in the category"""
+        return self.annotate(
+            live_product_count=Count('product', filter=Q(product__is_active=True, product__is_sold=False))
+        )
+
+
 class Category(models.Model):
     """Flexible categories for any type of products"""
     
@@ -24,6 +37,11 @@ class Category(models.Model):
     # Hierarchy support
     parent = models.ForeignKey('self', on_delete=models.CASCADE, blank=True, null=True, related_name='children', verbose_name='Kategori Induk')
     
+    # Materialized path of ancestor ids including self, e.g. "/1/5/12/".
+    # Maintained on save; subtrees are a single `path LIKE '/1/5/%'` lookup.
+    path = models.CharField(max_length=255, blank=True, editable=False, db_index=True)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    
     # Status
     is_active = models.BooleanField(default=True, verbose_name='Status Aktif')
     is_featured = models.BooleanField(default=False, verbose_name='Kategori Unggulan')
@@ -39,31 +57,101 @@ class Category(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CategoryQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Kategori'
         verbose_name_plural = 'Kategori'
         ordering = ['sort_order', 'name']
         
     def __str__(self):
-        if self.parent:
-            return f"{self.parent.name} > {self.name}"
+        if self.parent_id:
+            return f"{self.parent_name} > {self.name}"
         return self.name
     
+    def clean(self):
+        if self.pk and self.parent_id:
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).first() or ''
+            if f'/{self.pk}/' in parent_path:
+                raise ValidationError({'parent': 'Kategori induk tidak boleh turunan dari kategori ini.'})
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        # The row and its subtree paths change together or not at all
+        with transaction.atomic(using=kwargs.get('using')):
+            parent_path = self._parent_path()
+            super().save(*args, **kwargs)
+            self._update_path(parent_path)
+        # After the subtree paths are rewritten and committed, not from post_save
+        from ..tree import invalidate_category_tree
+        transaction.on_commit(invalidate_category_tree)
+    
+    def _parent_path(self):
+        """Path of the parent, checked before saving that it is not inside this category"""
+        if not self.parent_id:
+            return '/'
+        parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).get()
+        if self.pk and f'/{self.pk}/' in parent_path:
+            raise ValueError("Kategori tidak boleh menjadi induk dari dirinya sendiri")
+        return parent_path
+    
+    def _update_path(self, parent_path):
+        """Recompute the materialized path, moving the subtree if the parent changed"""
+        new_path = f'{parent_path}{self.pk}/'
+        old_path, old_depth = self.path, self.depth
+        if new_path == old_path:
+            return
+        
+        self.path = new_path
+        self.depth = new_path.count('/') - 2
+        Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+        if old_path:
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (self.depth - old_depth),
+            )
+    
+    @property
+    def parent_name(self):
+        """Name of the parent category, from the cached tree when not loaded"""
+        if not self.parent_id:
+            return None
+        if not Category.parent.is_cached(self):
+            from ..tree import get_category_tree
+            node = get_category_tree().get(self.parent_id)
+            if node:
+                return node.name
+        return self.parent.name
     
     @property
     def full_path(self):
         """Get full category path"""
+        from ..tree import get_category_tree
+        if self.pk:
+            path = get_category_tree().full_path(self.pk)
+            if path is not None:
+                return path
         if self.parent:
             return f"{self.parent.full_path} > {self.name}"
         return self.name
     
+    @property
+    def ancestor_ids(self):
+        """Ids of all ancestors, root first"""
+        return [int(part) for part in self.path.strip('/').split('/')[:-1] if part]
+    
+    def get_ancestors(self):
+        """Get all ancestors, root first, in one query"""
+        return Category.objects.filter(pk__in=self.ancestor_ids).order_by('depth')
+    
+    def get_descendants(self, include_self=False):
+        """Get the whole subtree in one query"""
+        descendants = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            descendants = descendants.exclude(pk=self.pk)
+        return descendants
+    
     def get_all_children(self):
         """Get all children recursively"""
-        children = list(self.children.all())
-        for child in list(children):
-            children.extend(child.get_all_children())
-        return children
+        return list(self.get_descendants().order_by('depth', 'sort_order', 'name'))
@@ -1,7 +1,14 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast
 from django.contrib.auth import get_user_model
 from django.utils.text import slugify
+from core.uploads import validate_image_upload
 from .category import Category
+from ..placeholders import read_image_size
+from ..search import search_products
+from ..storage import claim_blob, content_addressed_name, content_hash, get_product_image_storage
+import re
 import uuid
 import os
 
@@ -10,10 +17,62 @@ User = get_user_model()
 
 
 def upload_product_image(instance, filename):
-    """Upload path for product images"""
-    ext = filename.split('.')[-1]
-    filename = f"{uuid.uuid4()}.{ext}"
-    return os.path.join('products', instance.product.slug, filename)
+    """Upload path for product images: sharded by content hash, see brokers.storage"""
+    ext = filename.split('.')[-1].lower()
+    if instance.image and not instance.image._committed:
+        return content_addressed_name('products', content_hash(instance.image.file), ext)
+    return os.path.join('products', f"{uuid.uuid4()}.{ext}")
+
+
+# Maximum number of images per product
+MAX_PRODUCT_IMAGES = 10
+
+# Room is left after the title part of a slug for a "-<counter>" suffix
+SLUG_BASE_MAX_LENGTH = 200
+SLUG_MAX_ATTEMPTS = 3
+SLUG_QUERY_BATCH_SIZE = 100
+
+
+# Attribute keys promoted to typed, indexed generated columns: {key: column}
+PROMOTED_ATTRIBUTES = {
+    'tahun': 'attr_tahun',
+    'cc': 'attr_cc',
+    'km': 'attr_km',
+}
+
+
+def attribute_number(key):
+    """
+    Integer value of ``attributes[key]``, or NULL when it is missing or not a
+    plain integer (e.g. "150cc"), so the cast never fails on free-form data.
+    """
+    return models.Case(
+        models.When(
+            models.Q(**{f'attributes__{key}__regex': r'^[0-9]{1,9}$'}),
+            then=Cast(KeyTextTransform(key, 'attributes'), models.IntegerField()),
+        ),
+        default=None,
+        output_field=models.IntegerField(),
+    )
+
+
+class ProductQuerySet(models.QuerySet):
+    """Query helpers shared by the product endpoints"""
+
+    def search(self, query):
+        """Full-text search, annotating ``search_rank`` (see brokers.search)"""
+        return search_products(self, query)
+
+    def with_card_data(self):
+        """
+        Load what product cards render (category and main image) with a fixed
+        number of queries. The main image is prefetched into
+        ``prefetched_main_images``, which :attr:`Product.main_image` prefers.
+        """
+        main_images = ProductImage.objects.order_by('-is_main', 'order', 'created_at')[:1]
+        return self.select_related('category').prefetch_related(
+            models.Prefetch('images', queryset=main_images, to_attr='prefetched_main_images')
+        )
 
 
 class Product(models.Model):
@@ -42,6 +101,14 @@ class Product(models.Model):
     attributes = models.JSONField(default=dict, blank=True, verbose_name='Atribut Produk', 
                                 help_text='Data fleksibel dalam format JSON: {"tahun": "2020", "warna": "Merah", "cc": "150"}')
     
+    # Frequently filtered attributes, generated from the JSON (see PROMOTED_ATTRIBUTES)
+    attr_tahun = models.GeneratedField(expression=attribute_number('tahun'), output_field=models.IntegerField(),
+                                       db_persist=True, db_index=True, verbose_name='Tahun')
+    attr_cc = models.GeneratedField(expression=attribute_number('cc'), output_field=models.IntegerField(),
+                                    db_persist=True, db_index=True, verbose_name='CC')
+    attr_km = models.GeneratedField(expression=attribute_number('km'), output_field=models.IntegerField(),
+                                    db_persist=True, db_index=True, verbose_name='Kilometer')
+    
     # Location
     location_city = models.CharField(max_length=100, verbose_name='Kota')
     location_province = models.CharField(max_length=100, verbose_name='Provinsi')
@@ -69,14 +136,24 @@ class Product(models.Model):
     meta_title = models.CharField(max_length=200, blank=True, verbose_name='Meta Title')
     meta_description = models.TextField(blank=True, verbose_name='Meta Description')
     
+    # Analytics, maintained by buffered increments (see brokers.analytics)
+    view_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Jumlah View')
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Produk'
         verbose_name_plural = 'Produk'
         ordering = ['-created_at']
+        indexes = [
+            # Listing order and keyset pagination seek: (is_featured, created_at, id)
+            models.Index(fields=['-is_featured', '-created_at', '-id'], name='product_listing_idx'),
+            models.Index(fields=['seller', '-created_at', '-id'], name='product_seller_listing_idx'),
+        ]
         
     def __str__(self):
         if self.brand and self.model:
@@ -84,15 +161,70 @@ class Product(models.Model):
         return self.title
     
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.title)
-            slug = base_slug
-            counter = 1
-            while Product.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        
+        base_slug = self.base_slug(self.title)
+        for attempt in range(SLUG_MAX_ATTEMPTS):
+            self.slug = self.allocate_slug(base_slug, random_suffix=attempt == SLUG_MAX_ATTEMPTS - 1)
+            try:
+                # Savepoint, so a lost race does not break an outer transaction
+                with transaction.atomic(using=kwargs.get('using')):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Another insert took the slug in the meantime: allocate again
+                if attempt == SLUG_MAX_ATTEMPTS - 1 or not Product.objects.filter(slug=self.slug).exists():
+                    self.slug = ''
+                    raise
+    
+    @staticmethod
+    def base_slug(title):
+        """Slug of a title, leaving room for a numeric suffix"""
+        return slugify(title)[:SLUG_BASE_MAX_LENGTH].strip('-') or 'produk'
+    
+    @classmethod
+    def allocate_slug(cls, base_slug, random_suffix=False):
+        """
+        Unique slug for ``base_slug`` in one query: the base itself, or the
+        base with one more than the highest numeric suffix in use
+        ("honda-beat-2020-7"). ``random_suffix`` appends a short random
+        suffix instead, which cannot collide with the numbering.
+        """
+        if random_suffix:
+            return f"{base_slug}-{uuid.uuid4().hex[:8]}"
+        return cls.allocate_slugs([base_slug])[0]
+    
+    @classmethod
+    def allocate_slugs(cls, base_slugs):
+        """
+        Unique slugs for a batch of base slugs, which may repeat, with one
+        query per ``SLUG_QUERY_BATCH_SIZE`` distinct bases. Only slugs of
+        products titled like the base count as numbering, so "honda-beat-2020"
+        of "Honda Beat 2020" does not make the next "Honda Beat" "-2021".
+        """
+        taken = set()
+        highest = dict.fromkeys(base_slugs, 0)
+        distinct = list(highest)
+        for start in range(0, len(distinct), SLUG_QUERY_BATCH_SIZE):
+            matches = models.Q()
+            for base in distinct[start:start + SLUG_QUERY_BATCH_SIZE]:
+                # The prefix lets the slug index narrow the rows the regex runs on
+                matches |= models.Q(slug__startswith=base, slug__regex=rf'^{re.escape(base)}(-[0-9]+)?$')
+            for slug, title in cls.objects.filter(matches).values_list('slug', 'title'):
+                taken.add(slug)
+                stem, _, suffix = slug.rpartition('-')
+                if stem in highest and suffix.isdigit() and cls.base_slug(title) == stem:
+                    highest[stem] = max(highest[stem], int(suffix))
+        
+        slugs = []
+        for base in base_slugs:
+            slug = base
+            while slug in taken:
+                highest[base] += 1
+                slug = f"{base}-{highest[base]}"
+            slugs.append(slug)
+            taken.add(slug)
+        return slugs
     
     @property
     def whatsapp_link(self):
@@ -112,6 +244,8 @@ class Product(models.Model):
     @property
     def main_image(self):
         """Get the first/main image of the product"""
+        if hasattr(self, 'prefetched_main_images'):
+            return self.prefetched_main_images[0] if self.prefetched_main_images else None
         return self.images.filter(is_main=True).first() or self.images.first()
     
     @property
@@ -144,10 +278,20 @@ class ProductImage(models.Model):
     """Product images - maximum 10 per product"""
     
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images', verbose_name='Produk')
-    image = models.ImageField(upload_to=upload_product_image, verbose_name='Gambar')
+    image = models.ImageField(
+        upload_to=upload_product_image, storage=get_product_image_storage,
+        validators=[validate_image_upload], verbose_name='Gambar'
+    )
     caption = models.CharField(max_length=200, blank=True, verbose_name='Caption')
     is_main = models.BooleanField(default=False, verbose_name='Gambar Utama')
     order = models.PositiveIntegerField(default=0, verbose_name='Urutan')
+    # Intrinsic size, set on upload, and inline preview, set with the
+    # variants (see brokers.placeholders)
+    width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    placeholder = models.TextField(blank=True, editable=False)
+    # Resized variants, see brokers.variants
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -166,10 +310,30 @@ class ProductImage(models.Model):
         # Validate maximum 10 images per product
         if not self.pk:  # New image
             existing_count = ProductImage.objects.filter(product=self.product).count()
-            if existing_count >= 10:
+            if existing_count >= MAX_PRODUCT_IMAGES:
                 raise ValueError("Maksimal 10 gambar per produk")
         
-        super().save(*args, **kwargs)
+        # A newly uploaded file needs new variants (queued by brokers.signals)
+        self._image_uploaded = bool(self.image) and not self.image._committed
+        self._replaced_image = None
+        if not self._image_uploaded:
+            return super().save(*args, **kwargs)
+        
+        self.variants = {}
+        upload = self.image.file
+        self.set_metadata(upload)
+        if self.pk:
+            # The old blob may become unreferenced (released by brokers.signals)
+            self._replaced_image = ProductImage.objects.filter(pk=self.pk).values_list('image', 'variants').first()
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            # A concurrent release may have deleted the shared blob since it was found
+            claim_blob(self.image.storage, self.image.name, upload, using=kwargs.get('using'))
+    
+    def set_metadata(self, file):
+        """Set width and height from the image header; the placeholder follows with the variants"""
+        self.width, self.height = read_image_size(file)
+        self.placeholder = ''
 
 
 class ProductView(models.Model):
@@ -0,0 +1,157 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the queryset's own ordering.
+
+    The cursor is an opaque token holding the ordering values of the last row
+    of the page, e.g. ``(is_featured, created_at, id)`` for product listings.
+    The next page is fetched with a ``WHERE (ordering) < (cursor)`` condition
+    instead of an ``OFFSET``, and no ``COUNT(*)`` is run, so every page costs
+    the same no matter how deep the client scrolls.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'page')
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            values = self.decode_cursor(encoded, queryset)
+            queryset = queryset.filter(self.get_keyset_condition(values))
+
+        # Fetch one extra row to know whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_ordering(self, queryset):
+        """Queryset ordering with the primary key appended as a tie-breaker"""
+        ordering = list(queryset.query.order_by or queryset.query.get_meta().ordering)
+        for field in ordering:
+            if not isinstance(field, str) or '__' in field or field.lstrip('-') == '?':
+                raise NotFound('Cursor pagination is not available for this ordering.')
+        names = {field.lstrip('-') for field in ordering}
+        if not names & {'pk', 'id'}:
+            descending = ordering[-1].startswith('-') if ordering else False
+            ordering.append('-id' if descending else 'id')
+        return ordering
+
+    def get_keyset_condition(self, values):
+        """``(f1, f2, ...) > (v1, v2, ...)`` honouring each field's direction"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        values = [self.encode_value(getattr(last, field.lstrip('-'))) for field in self.ordering]
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(values))
+
+    def encode_value(self, value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def encode_cursor(self, values):
+        payload = json.dumps({'o': self.ordering, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, encoded, queryset):
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if payload['o'] != self.ordering or len(payload['v']) != len(self.ordering):
+                raise ValueError('Cursor ordering mismatch')
+            return [
+                self.get_field(queryset, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, payload['v'])
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_field(self, queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            if name == 'pk':
+                return queryset.model._meta.pk
+            raise ValueError(f'Unknown ordering field: {name}')
+
+
+class ProductPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset mode.
+
+    Passing ``?cursor=`` (empty for the first page) switches to
+    :class:`KeysetPagination`; the response then carries a ``next`` link
+    with an opaque cursor instead of page numbers and a total count.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.keyset_class.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque keyset cursor. Pass an empty value to start cursor pagination.',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -0,0 +1,69 @@
+"""
+Intrinsic size and low-quality placeholder of an uploaded image.
+
+The size is read from the header when a ``ProductImage`` is uploaded and the
+placeholder is rendered with the variants, so clients can reserve the layout
+box and paint a blurred preview before the real image loads. The
+placeholder is a ~20px WebP inlined as a ``data:`` URI (a few hundred bytes).
+"""
+import base64
+from io import BytesIO
+from PIL import ExifTags, Image, ImageOps
+
+PLACEHOLDER_SIZE = (20, 20)
+
+# EXIF orientations that rotate the image by 90 degrees
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def read_image_size(file):
+    """
+    ``(width, height)`` of an image file as displayed (after EXIF rotation),
+    from the header only, so it is cheap enough for the upload request. The
+    file position is restored afterwards. Files Pillow cannot read give
+    ``(None, None)``.
+    """
+    position = file.tell()
+    try:
+        with Image.open(file) as source:
+            width, height = source.size
+            # EXIF parsed at open; getexif() would decode a whole PNG to look further
+            exif = Image.Exif()
+            exif.load(source.info.get('exif', b''))
+    except (OSError, Image.DecompressionBombError):
+        return None, None
+    finally:
+        file.seek(position)
+    if exif.get(ExifTags.Base.Orientation) in TRANSPOSED_ORIENTATIONS:
+        width, height = height, width
+    return width, height
+
+
+def render_placeholder(file):
+    """
+    Placeholder ``data:`` URI of an image file, or ``''`` if it cannot be
+    decoded. JPEGs are decoded at a reduced scale with ``draft()``, other
+    formats in full, so this runs off the request path (see
+    ``brokers.variants``). The file position is restored afterwards.
+    """
+    position = file.tell()
+    try:
+        with Image.open(file) as source:
+            source.draft('RGB', PLACEHOLDER_SIZE)
+            preview = ImageOps.exif_transpose(source).convert('RGB')
+        preview.thumbnail(PLACEHOLDER_SIZE, Image.BILINEAR)
+        buffer = BytesIO()
+        preview.save(buffer, format='WEBP', quality=40)
+    except (OSError, Image.DecompressionBombError):
+        return ''
+    finally:
+        file.seek(position)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def read_image_metadata(file):
+    """``(width, height, placeholder)`` of an image file, for offline backfills"""
+    width, height = read_image_size(file)
+    if width is None:
+        return None, None, ''
+    return width, height, render_placeholder(file)
@@ -0,0 +1,155 @@
+"""
+Full-text search for products.
+
+PostgreSQL keeps a weighted ``tsvector`` generated column with a GIN index on
+``brokers_product``; SQLite keeps an FTS5 index synced by triggers. Both are
+installed by :func:`install_search_index` and queried through
+:func:`search_products`, so views never build ``icontains`` chains themselves.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+PRODUCT_TABLE = 'brokers_product'
+FTS_TABLE = 'brokers_product_fts'
+
+# Search config for to_tsvector: listings are mostly Indonesian, which has no
+# built-in stemmer, so plain lower-cased tokens work best.
+SEARCH_CONFIG = 'simple'
+
+# Weighted columns, highest relevance first. Column order matters for the
+# SQLite bm25() weights below.
+SEARCH_COLUMNS = [
+    ('title', 'A', 10.0),
+    ('brand', 'B', 5.0),
+    ('model', 'B', 5.0),
+    ('location_city', 'C', 2.0),
+    ('description', 'D', 1.0),
+]
+
+MAX_SEARCH_TERMS = 8
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Split a user query into lower-cased word tokens"""
+    return TOKEN_RE.findall(query.lower())[:MAX_SEARCH_TERMS]
+
+
+def search_products(queryset, query):
+    """
+    Filter a product queryset by a free-text query and annotate ``search_rank``
+    (higher is more relevant). Falls back to ``icontains`` on databases
+    without a search index.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f"'{term}':*" for term in terms)
+        match = RawSQL(
+            f"{PRODUCT_TABLE}.search_vector @@ to_tsquery('{SEARCH_CONFIG}', %s)",
+            [tsquery], output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank({PRODUCT_TABLE}.search_vector, to_tsquery('{SEARCH_CONFIG}', %s))",
+            [tsquery], output_field=FloatField(),
+        )
+    elif vendor == 'sqlite':
+        fts_query = ' AND '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for _, _, weight in SEARCH_COLUMNS)
+        match = RawSQL(
+            f"{PRODUCT_TABLE}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+            [fts_query], output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"(SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {PRODUCT_TABLE}.id)",
+            [fts_query], output_field=FloatField(),
+        )
+    else:
+        condition = Q()
+        for term in terms:
+            term_q = Q()
+            for column, _, _ in SEARCH_COLUMNS:
+                term_q |= Q(**{f'{column}__icontains': term})
+            condition &= term_q
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    return queryset.alias(search_match=match).filter(search_match=True).annotate(search_rank=rank)
+
+
+def _postgresql_statements():
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight, _ in SEARCH_COLUMNS
+    )
+    return [
+        f"ALTER TABLE {PRODUCT_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS {PRODUCT_TABLE}_search_gin ON {PRODUCT_TABLE} USING gin (search_vector)",
+    ]
+
+
+def _sqlite_statements(cursor):
+    columns = ', '.join(column for column, _, _ in SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column, _, _ in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column, _, _ in SEARCH_COLUMNS)
+    delete_old = (
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});"
+    triggers = {
+        f'{FTS_TABLE}_ai': f"AFTER INSERT ON {PRODUCT_TABLE} BEGIN {insert_new} END",
+        f'{FTS_TABLE}_ad': f"AFTER DELETE ON {PRODUCT_TABLE} BEGIN {delete_old} END",
+        f'{FTS_TABLE}_au': f"AFTER UPDATE OF {columns} ON {PRODUCT_TABLE} BEGIN {delete_old} {insert_new} END",
+    }
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+    existing = {row[0] for row in cursor.fetchall()}
+    if PRODUCT_TABLE not in existing:
+        return []
+
+    statements = []
+    if FTS_TABLE not in existing:
+        statements.append(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({columns}, content='{PRODUCT_TABLE}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+    missing = [name for name in triggers if name not in existing]
+    for name in missing:
+        statements.append(f"CREATE TRIGGER {name} {triggers[name]}")
+    if statements:
+        # Triggers are dropped whenever Django rebuilds the table during a
+        # migration, so the index may have missed writes: rebuild it.
+        statements.append(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return statements
+
+
+def install_search_index(connection):
+    """Create (or repair) the search index for the given connection. Idempotent."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            statements = _postgresql_statements()
+        elif connection.vendor == 'sqlite':
+            statements = _sqlite_statements(cursor)
+        else:
+            statements = []
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def uninstall_search_index(connection):
+    """Drop the search index for the given connection"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {PRODUCT_TABLE}_search_gin")
+            cursor.execute(f"ALTER TABLE {PRODUCT_TABLE} DROP COLUMN IF EXISTS search_vector")
+        elif connection.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
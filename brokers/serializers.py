@@ -1,9 +1,14 @@
 from rest_framework import serializers
+from core.uploads import UploadedImageField
+from .images import attach_images
 from .models import Category, Product, ProductImage, ProductInquiry
+from .models.product import MAX_PRODUCT_IMAGES
+from .tree import get_category_tree
+from .variants import VARIANT_FORMATS, variant_urls
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    product_count = serializers.IntegerField(source='product_set.count', read_only=True)
+    product_count = serializers.SerializerMethodField()
     full_path = serializers.CharField(read_only=True)
     
     class Meta:
@@ -14,17 +19,60 @@ class CategorySerializer(serializers.ModelSerializer):
             'full_path', 'created_at', 'updated_at'
         ]
         read_only_fields = ['slug', 'created_at', 'updated_at']
+    
+    def get_product_count(self, obj):
+        """Live product count, annotated by ``Category.objects.with_product_count()``"""
+        count = getattr(obj, 'live_product_count', None)
+        if count is None:
+            count = obj.product_set.filter(is_active=True, is_sold=False).count()
+        return count
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    """
+    Product image with ``src``, the smallest variant adequate for where the
+    image is shown (``preferred_variant``), and per-format ``srcset`` strings.
+    Both fall back to the original upload until variants exist.
+    """
+    preferred_variant = 'gallery'
+    
+    src = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+    
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'caption', 'is_main', 'order', 'created_at']
-        read_only_fields = ['created_at']
+        fields = [
+            'id', 'image', 'src', 'srcset', 'width', 'height', 'placeholder',
+            'caption', 'is_main', 'order', 'created_at'
+        ]
+        read_only_fields = ['width', 'height', 'placeholder', 'created_at']
+    
+    def build_url(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+    
+    def get_src(self, obj):
+        variant = variant_urls(obj).get(self.preferred_variant)
+        if variant:
+            return self.build_url(variant['jpeg'])
+        return self.build_url(obj.image.url) if obj.image else None
+    
+    def get_srcset(self, obj):
+        variants = sorted(variant_urls(obj).values(), key=lambda variant: variant['width'])
+        return {
+            extension: ', '.join(f"{self.build_url(variant[extension])} {variant['width']}w" for variant in variants)
+            for extension in VARIANT_FORMATS
+            if variants and all(extension in variant for variant in variants)
+        }
+
+
+class ProductCardImageSerializer(ProductImageSerializer):
+    """Image shown on product cards"""
+    preferred_variant = 'card'
 
 
 class ProductListSerializer(serializers.ModelSerializer):
-    main_image = ProductImageSerializer(read_only=True)
+    main_image = ProductCardImageSerializer(read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     formatted_price = serializers.CharField(read_only=True)
     
@@ -43,7 +91,6 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     formatted_price = serializers.CharField(read_only=True)
     whatsapp_link = serializers.CharField(read_only=True)
-    view_count = serializers.IntegerField(source='views.count', read_only=True)
     seller_name = serializers.CharField(source='seller.get_full_name', read_only=True)
     
     class Meta:
@@ -56,15 +103,16 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'description', 'category', 'images', 'is_featured', 'view_count',
             'seller_name', 'created_at', 'updated_at'
         ]
+        read_only_fields = ['view_count']
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     uploaded_images = serializers.ListField(
-        child=serializers.ImageField(),
+        child=UploadedImageField(),
         write_only=True,
         required=False,
-        max_length=10
+        max_length=MAX_PRODUCT_IMAGES
     )
     
     class Meta:
@@ -76,18 +124,22 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
             'description', 'meta_title', 'meta_description', 'images', 'uploaded_images'
         ]
     
+    def validate_uploaded_images(self, value):
+        if self.instance is not None and value:
+            existing_count = self.instance.images.count()
+            if existing_count + len(value) > MAX_PRODUCT_IMAGES:
+                raise serializers.ValidationError(
+                    f'Maksimal {MAX_PRODUCT_IMAGES} gambar per produk '
+                    f'({existing_count} sudah diunggah).'
+                )
+        return value
+    
     def create(self, validated_data):
         uploaded_images = validated_data.pop('uploaded_images', [])
         product = Product.objects.create(**validated_data)
         
-        # Create product images
-        for index, image in enumerate(uploaded_images):
-            ProductImage.objects.create(
-                product=product,
-                image=image,
-                order=index,
-                is_main=(index == 0)  # First image is main
-            )
+        # Create product images; the first image is main
+        attach_images(product, uploaded_images)
         
         return product
     
@@ -100,19 +152,36 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
         instance.save()
         
         # Add new images if provided
-        if uploaded_images:
-            existing_count = instance.images.count()
-            for index, image in enumerate(uploaded_images):
-                if existing_count + index < 10:  # Max 10 images
-                    ProductImage.objects.create(
-                        product=instance,
-                        image=image,
-                        order=existing_count + index
-                    )
+        attach_images(instance, uploaded_images, main_first=False)
         
         return instance
 
 
+class ProductImportSerializer(serializers.ModelSerializer):
+    """
+    Validates one row of a bulk import (see brokers.importer). ``category``
+    is a category id or slug, resolved against the cached category tree
+    (or ``context['category_tree']``, fixed for the whole import).
+    """
+    category = serializers.CharField()
+    
+    class Meta:
+        model = Product
+        fields = [
+            'title', 'category', 'brand', 'model', 'condition', 'attributes',
+            'price', 'currency', 'is_negotiable', 'location_city', 'location_province',
+            'location_detail', 'contact_name', 'contact_phone', 'contact_email',
+            'description', 'meta_title', 'meta_description'
+        ]
+    
+    def validate_category(self, value):
+        tree = self.context.get('category_tree') or get_category_tree()
+        node = tree.get(int(value)) if value.isdigit() else tree.get_by_slug(value)
+        if node is None:
+            raise serializers.ValidationError(f'Kategori "{value}" tidak ditemukan.')
+        return node.id
+
+
 class ProductInquirySerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductInquiry
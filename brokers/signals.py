@@ -0,0 +1,49 @@
+from django.db.models.signals import post_migrate, post_save, post_delete
+from django.dispatch import receiver
+from django.db import connections, transaction
+from .cache import PRODUCT, bump_generation_on_commit
+from .models import Category, Product, ProductImage
+from .search import install_search_index
+from .images import release_image
+from .tasks import queue_image_variants
+from .tree import invalidate_category_tree
+
+
+@receiver(post_migrate)
+def ensure_search_index(sender, using, **kwargs):
+    """Repair the product search index after migrations rebuild tables"""
+    if sender.name == 'brokers':
+        install_search_index(connections[using])
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductImage)
+def invalidate_product_responses(sender, **kwargs):
+    """Invalidate cached product responses once a listing change commits"""
+    bump_generation_on_commit(PRODUCT)
+
+
+@receiver(post_save, sender=ProductImage)
+def queue_product_image_variants(sender, instance, **kwargs):
+    """Generate resized variants for newly uploaded product images"""
+    if getattr(instance, '_image_uploaded', False):
+        transaction.on_commit(lambda: queue_image_variants([instance.pk]))
+    if getattr(instance, '_replaced_image', None):
+        name, variants = instance._replaced_image
+        transaction.on_commit(lambda: release_image(name, variants))
+
+
+@receiver(post_delete, sender=ProductImage)
+def release_product_image(sender, instance, **kwargs):
+    """Delete the image blob once no other product image shares it"""
+    name, variants = instance.image.name, instance.variants
+    transaction.on_commit(lambda: release_image(name, variants))
+
+
+@receiver(post_delete, sender=Category)
+def invalidate_category_responses(sender, **kwargs):
+    """
+    Invalidate cached category responses and the category tree once a
+    delete commits (saves do this from ``Category.save``)
+    """
+    transaction.on_commit(invalidate_category_tree)
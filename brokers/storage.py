@@ -0,0 +1,87 @@
+"""
+Content-addressed storage for product images.
+
+Uploads are hashed (SHA-256, streamed in chunks) and stored as
+``products/<ab>/<cd>/<sha256>.<ext>``, so the same photo uploaded for several
+listings is written once and every ``ProductImage`` row points at the same
+blob. Blobs are not reference counted in a separate table: the reference
+count is the number of rows naming the blob, checked when a row is deleted
+or its file replaced (see ``brokers.images.release_image``).
+
+A release and an upload of the same content can interleave: the upload finds
+the blob and skips the write, then the release sees no row and deletes it
+before the upload's row is inserted. Both sides take ``lock_blob`` and the
+upload re-creates a missing blob after its insert (``claim_blob``).
+"""
+import hashlib
+import os
+import re
+from django.core.files.storage import FileSystemStorage
+from django.db import DEFAULT_DB_ALIAS, connections
+
+CONTENT_ADDRESSED_RE = re.compile(r'^[\w/]*/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+def content_hash(file):
+    """SHA-256 hex digest of a Django ``File``, read in chunks; the position is restored"""
+    position = file.tell()
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(position)
+    return digest.hexdigest()
+
+
+def content_addressed_name(prefix, digest, extension):
+    """Sharded storage name of a blob, e.g. ``products/9f/86/9f86d0...08.jpg``"""
+    return os.path.join(prefix, digest[:2], digest[2:4], f'{digest}.{extension}')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that stores each content-addressed name once. Saving
+    content under a name that already exists is a no-op, since equal names
+    mean equal content. Other names behave as in ``FileSystemStorage``.
+    """
+
+    def save(self, name, content, max_length=None):
+        if not CONTENT_ADDRESSED_RE.match(name or ''):
+            return super().save(name, content, max_length=max_length)
+        if self.exists(name):
+            return name
+        saved = super().save(name, content, max_length=max_length)
+        if saved != name:
+            # Lost a race with an upload of the same content: keep the first copy
+            self.delete(saved)
+        return name
+
+
+def lock_blob(name, using=None):
+    """
+    Serialize the uploads and the release of one blob until the current
+    transaction ends, with a PostgreSQL advisory lock (a no-op elsewhere)
+    """
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [name])
+
+
+def claim_blob(storage, name, content, using=None):
+    """
+    Re-create the blob of a newly inserted row if a concurrent release deleted
+    it after ``save`` found it. Call inside the transaction of the insert.
+    """
+    if not CONTENT_ADDRESSED_RE.match(name or ''):
+        return
+    lock_blob(name, using)
+    if not storage.exists(name):
+        content.seek(0)
+        storage.save(name, content)
+
+
+product_image_storage = ContentAddressedStorage()
+
+
+def get_product_image_storage():
+    return product_image_storage
@@ -0,0 +1,37 @@
+import logging
+from celery import shared_task
+from .analytics import flush_view_counts, flush_view_events
+from .variants import update_image_variants
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def flush_product_view_counts():
+    """Apply buffered view counts to Product.view_count"""
+    return flush_view_counts()
+
+
+@shared_task(ignore_result=True)
+def flush_product_views():
+    """Store queued product view events as ProductView rows"""
+    return flush_view_events()
+
+
+@shared_task(ignore_result=True)
+def generate_image_variants(image_id):
+    """Generate the resized variants of a product image"""
+    return update_image_variants(image_id)
+
+
+def queue_image_variants(image_ids):
+    """
+    Queue variant generation for product images. Images that cannot be
+    queued keep serving their original file until ``backfill_image_variants``
+    runs.
+    """
+    for image_id in image_ids:
+        try:
+            generate_image_variants.delay(image_id)
+        except Exception:
+            logger.warning('Could not queue variants for product image %s', image_id, exc_info=True)
@@ -0,0 +1,1159 @@
+import csv
+import json
+import tempfile
+import time
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image, ImageFile
+from rest_framework.test import APIClient
+from .analytics import apply_view_counts, flush_view_events, store_view_events
+from .cache import PRODUCT, get_generations
+from .images import attach_images
+from .models import Category, Product, ProductImage, ProductInquiry, ProductView
+from .storage import content_addressed_name, content_hash
+from .tree import clear_local_tree, get_category_tree
+from .variants import update_image_variants
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ListBuffer:
+    """Just enough of a Redis client for the view event list"""
+
+    def __init__(self, items):
+        self.items = list(items)
+
+    def lock(self, *args, **kwargs):
+        return mock.Mock(acquire=mock.Mock(return_value=True))
+
+    def lrange(self, key, start, end):
+        return self.items[start:end + 1]
+
+    def ltrim(self, key, start, end):
+        self.items = self.items[start:]
+
+    def pipeline(self, *args, **kwargs):
+        return mock.MagicMock()
+
+
+class ProductTestMixin:
+    """Helpers for creating categories and products"""
+
+    def create_category(self, name='Motor', **kwargs):
+        # Caches are invalidated on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            return Category.objects.create(name=name, **kwargs)
+
+    def create_product(self, title='Honda Beat 2020', **kwargs):
+        defaults = {
+            'category': self.category,
+            'seller': self.user,
+            'condition': 'good',
+            'price': Decimal('15000000'),
+            'location_city': 'Bandung',
+            'location_province': 'Jawa Barat',
+            'contact_name': 'Seller',
+            'contact_phone': '081234567890',
+            'description': 'Kondisi terawat',
+        }
+        defaults.update(kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(title=title, **defaults)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductSearchTest(ProductTestMixin, TestCase):
+    """Test cases for full-text product search"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.category = self.create_category()
+        self.url = reverse('brokers:product-list')
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data['results']]
+
+    def test_search_matches_prefix_across_fields(self):
+        """Test search matches title, brand and description tokens by prefix"""
+        self.create_product('Honda Beat 2020', brand='Honda')
+        self.create_product('Yamaha NMAX', brand='Yamaha', description='Mesin halus')
+        self.assertEqual(self.search('hond'), ['Honda Beat 2020'])
+        self.assertEqual(self.search('mesin'), ['Yamaha NMAX'])
+        self.assertEqual(self.search('suzuki'), [])
+
+    def test_search_ranks_title_above_description(self):
+        """Test title matches are ordered before description-only matches"""
+        self.create_product('Yamaha NMAX', description='Lebih irit dari Vario')
+        self.create_product('Honda Vario 125')
+        self.assertEqual(self.search('vario'), ['Honda Vario 125', 'Yamaha NMAX'])
+
+    def test_search_index_follows_updates(self):
+        """Test updated and deleted products are reflected in search"""
+        product = self.create_product('Honda Beat 2020')
+        product.title = 'Honda Scoopy 2021'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self.search('beat'), [])
+        self.assertEqual(self.search('scoopy'), ['Honda Scoopy 2021'])
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(self.search('scoopy'), [])
+
+    def test_category_products_search(self):
+        """Test category products action uses the same search backend"""
+        self.create_product('Honda Beat 2020')
+        self.create_product('Yamaha NMAX')
+        self.client.force_authenticate(user=self.user)
+        url = reverse('brokers:category-products', kwargs={'slug': self.category.slug})
+        response = self.client.get(url, {'search': 'nmax'})
+        self.assertEqual([item['title'] for item in response.data['results']], ['Yamaha NMAX'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductCursorPaginationTest(ProductTestMixin, TestCase):
+    """Test cases for opt-in keyset pagination"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.category = self.create_category()
+        self.url = reverse('brokers:product-list')
+        for index in range(25):
+            self.create_product(f'Produk {index}', is_featured=(index % 7 == 0))
+
+    def walk(self, url, params):
+        slugs, pages = [], 0
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            slugs.extend(item['slug'] for item in response.data['results'])
+            pages += 1
+            if not response.data['next']:
+                return slugs, pages
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_walk_matches_page_number_order(self):
+        """Test following cursors yields every product once, in listing order"""
+        expected = list(
+            Product.objects.order_by('-is_featured', '-created_at', '-id').values_list('slug', flat=True)
+        )
+        slugs, pages = self.walk(self.url, {'cursor': ''})
+        self.assertEqual(slugs, expected)
+        self.assertEqual(pages, 2)
+
+    def test_cursor_with_explicit_ordering(self):
+        """Test cursors follow the ?ordering= parameter with an id tie-breaker"""
+        slugs, _ = self.walk(self.url, {'cursor': '', 'ordering': 'price'})
+        self.assertEqual(sorted(slugs), sorted(Product.objects.values_list('slug', flat=True)))
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is rejected"""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_pagination_is_default(self):
+        """Test page-number pagination is kept when no cursor is given"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 25)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductListQueryCountTest(ProductTestMixin, TestCase):
+    """Test list endpoints render product cards with a fixed number of queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.category = self.create_category()
+        self.client.force_authenticate(user=self.user)
+        get_category_tree()
+
+    def add_products(self, count):
+        for _ in range(count):
+            product = self.create_product(is_featured=True)
+            ProductImage.objects.create(product=product, image=f'products/{product.slug}/a.jpg', order=0)
+            ProductImage.objects.create(product=product, image=f'products/{product.slug}/b.jpg', order=1, is_main=True)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def assert_constant_queries(self, url):
+        self.add_products(2)
+        small, _ = self.count_queries(url)
+        self.add_products(6)
+        large, response = self.count_queries(url)
+        self.assertEqual(small, large)
+        return response
+
+    def test_product_list(self):
+        """Test product list query count does not grow with page size"""
+        response = self.assert_constant_queries(reverse('brokers:product-list'))
+        card = response.data['results'][0]
+        self.assertTrue(card['main_image']['image'].endswith('b.jpg'))
+        self.assertEqual(card['category_name'], 'Motor')
+
+    def test_featured(self):
+        """Test featured query count does not grow with result size"""
+        self.assert_constant_queries(reverse('brokers:product-featured'))
+
+    def test_my_products(self):
+        """Test my_products query count does not grow with page size"""
+        self.assert_constant_queries(reverse('brokers:product-my-products'))
+
+    def test_category_products(self):
+        """Test category products query count does not grow with page size"""
+        self.assert_constant_queries(reverse('brokers:category-products', kwargs={'slug': self.category.slug}))
+
+    def test_main_image_matches_unprefetched(self):
+        """Test the prefetched main image is the one main_image would query"""
+        self.add_products(1)
+        ProductImage.objects.create(product=Product.objects.get(), image='products/c.jpg', order=2)
+        product = Product.objects.get()
+        self.assertEqual(Product.objects.with_card_data().get().main_image, product.main_image)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductViewCountTest(ProductTestMixin, TestCase):
+    """Test cases for the denormalized view counter"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.category = self.create_category()
+        self.product = self.create_product()
+        self.url = reverse('brokers:product-detail', kwargs={'slug': self.product.slug})
+
+    def test_unique_views_increment_counter(self):
+        """Test only new (product, ip, session) views increment view_count"""
+        self.client.get(self.url, REMOTE_ADDR='10.0.0.1')
+        self.client.get(self.url, REMOTE_ADDR='10.0.0.1')
+        self.client.get(self.url, REMOTE_ADDR='10.0.0.2')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_count, 2)
+
+    def test_apply_view_counts(self):
+        """Test batched increments are added to the stored counter"""
+        other = self.create_product('Yamaha NMAX')
+        apply_view_counts({self.product.pk: 3, other.pk: 3})
+        apply_view_counts({self.product.pk: 2})
+        self.assertEqual(
+            dict(Product.objects.values_list('pk', 'view_count')),
+            {self.product.pk: 5, other.pk: 3},
+        )
+
+    def test_apply_view_counts_all_or_none(self):
+        """Test a failed UPDATE leaves no increment applied, so a retry counts once"""
+        other = self.create_product('Yamaha NMAX')
+        update = QuerySet.update
+        calls = []
+
+        def fail_second(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise DatabaseError('koneksi terputus')
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=fail_second):
+            with self.assertRaises(DatabaseError):
+                apply_view_counts({self.product.pk: 3, other.pk: 2})
+        self.assertEqual(set(Product.objects.values_list('view_count', flat=True)), {0})
+
+    def test_store_view_events_deduplicates(self):
+        """Test buffered events are deduplicated against each other and stored rows"""
+        event = {'product_id': self.product.pk, 'ip_address': '10.0.0.1', 'session_key': 'abc', 'user_agent': ''}
+        self.assertEqual(store_view_events([event, dict(event), {**event, 'session_key': 'def'}]), 2)
+        self.assertEqual(store_view_events([event, {**event, 'product_id': 0}]), 0)
+        self.assertEqual(ProductView.objects.count(), 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_count, 2)
+
+    def test_flush_keeps_events_when_store_fails(self):
+        """Test a failed store leaves the batch queued for the next flush"""
+        events = [
+            json.dumps({'product_id': self.product.pk, 'ip_address': ip, 'session_key': '', 'user_agent': ''})
+            for ip in ['10.0.0.1', '10.0.0.2']
+        ]
+        buffer = ListBuffer(events)
+        with mock.patch('brokers.analytics.get_buffer', return_value=buffer):
+            with mock.patch('brokers.analytics.store_view_events', side_effect=DatabaseError):
+                with self.assertRaises(DatabaseError):
+                    flush_view_events()
+            self.assertEqual(buffer.items, events)
+            self.assertEqual(flush_view_events(), 2)
+        self.assertEqual(buffer.items, [])
+        self.assertEqual(ProductView.objects.count(), 2)
+
+    def test_invalid_client_address_is_ignored(self):
+        """Test a malformed X-Forwarded-For does not break the detail endpoint"""
+        response = self.client.get(self.url, HTTP_X_FORWARDED_FOR='not-an-ip')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ProductView.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductResponseCacheTest(ProductTestMixin, TestCase):
+    """Test cases for the versioned response cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.category = self.create_category()
+        self.product = self.create_product()
+        self.list_url = reverse('brokers:product-list')
+        self.detail_url = reverse('brokers:product-detail', kwargs={'slug': self.product.slug})
+
+    def test_repeated_reads_skip_database(self):
+        """Test identical requests are served from cache"""
+        first = self.client.get(self.list_url, {'ordering': 'price', 'search': 'honda'})
+        with self.assertNumQueries(0):
+            second = self.client.get(self.list_url, {'search': 'honda', 'ordering': 'price'})
+        self.assertEqual(first.data, second.data)
+
+    def test_product_save_invalidates(self):
+        """Test editing a listing invalidates list and detail responses"""
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        self.product.price = Decimal('12000000')
+        generations = get_generations(PRODUCT)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+            # Only after commit, or a concurrent read could cache the old row
+            self.assertEqual(get_generations(PRODUCT), generations)
+        self.assertEqual(self.client.get(self.list_url).data['results'][0]['price'], '12000000.00')
+        self.assertEqual(self.client.get(self.detail_url).data['price'], '12000000.00')
+
+    def test_image_and_category_changes_invalidate(self):
+        """Test image and category writes invalidate product responses"""
+        self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=self.product, image='products/a.jpg')
+        self.assertEqual(len(self.client.get(self.detail_url).data['images']), 1)
+        self.category.name = 'Motor Bekas'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertEqual(self.client.get(self.detail_url).data['category']['name'], 'Motor Bekas')
+
+    def test_cached_detail_still_tracks_views(self):
+        """Test views are recorded for cached detail responses"""
+        self.client.get(self.detail_url, REMOTE_ADDR='10.0.0.1')
+        self.client.get(self.detail_url, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(ProductView.objects.count(), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalGetTest(ProductTestMixin, TestCase):
+    """Test cases for ETag / Last-Modified handling"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.category = self.create_category()
+        self.product = self.create_product(is_featured=True)
+        self.detail_url = reverse('brokers:product-detail', kwargs={'slug': self.product.slug})
+
+    def assert_revalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        return etag
+
+    def test_product_detail(self):
+        """Test product detail answers If-None-Match and changes ETag on edit"""
+        etag = self.assert_revalidates(self.detail_url)
+        self.product.title = 'Honda Beat 2021'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_not_modified_skips_serializer_and_tracking(self):
+        """Test a 304 is answered with one query and records no view"""
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag, REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(ProductView.objects.filter(ip_address='10.0.0.9').exists())
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since is honoured"""
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_after_image_change(self):
+        """Test writes that bypass updated_at still end If-Modified-Since 304s"""
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+        with mock.patch('brokers.cache.time.time', return_value=time.time() + 5):
+            with self.captureOnCommitCallbacks(execute=True):
+                ProductImage.objects.create(product=self.product, image='products/a.jpg')
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        cache.clear()
+        self.assertNotIn('Last-Modified', self.client.get(self.detail_url))
+
+    def test_featured_and_categories(self):
+        """Test featured and category endpoints emit validators"""
+        featured_url = reverse('brokers:product-featured')
+        etag = self.assert_revalidates(featured_url)
+        self.client.force_authenticate(user=self.user)
+        self.assert_revalidates(reverse('brokers:category-list'))
+        self.assert_revalidates(reverse('brokers:category-detail', kwargs={'slug': self.category.slug}))
+        # Image writes do not touch Product.updated_at but still change the ETag
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=self.product, image='products/a.jpg')
+        response = self.client.get(featured_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_product_is_404(self):
+        """Test unknown slugs still 404"""
+        url = reverse('brokers:product-detail', kwargs={'slug': 'missing'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"x"').status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductFacetsTest(ProductTestMixin, TestCase):
+    """Test cases for the facets action"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.category = self.create_category()
+        self.other_category = self.create_category('Mobil')
+        self.url = reverse('brokers:product-facets')
+        self.create_product('Honda Beat', price=Decimal('12000000'))
+        self.create_product('Honda Vario', price=Decimal('18000000'), condition='new')
+        self.create_product('Honda Jazz', category=self.other_category, price=Decimal('150000000'),
+                            location_province='DKI Jakarta')
+        self.create_product('Honda Civic', category=self.other_category, price=Decimal('20000'), currency='USD')
+        self.create_product('Honda Brio', is_sold=True)
+
+    def test_facet_counts(self):
+        """Test facets count the filtered listing in every dimension"""
+        with self.assertNumQueries(2):
+            data = self.client.get(self.url).data
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(
+            {item['name']: item['count'] for item in data['category']},
+            {'Mobil': 2, 'Motor': 2},
+        )
+        self.assertEqual(
+            {item['value']: item['count'] for item in data['condition']},
+            {'good': 3, 'new': 1},
+        )
+        self.assertEqual(
+            {item['value']: item['count'] for item in data['currency']},
+            {'IDR': 3, 'USD': 1},
+        )
+        self.assertEqual(
+            [(item['min'], item['max'], item['count']) for item in data['price']],
+            [(10_000_000, 50_000_000, 2), (100_000_000, 500_000_000, 1)],
+        )
+
+    def test_facets_follow_search_and_price_filters(self):
+        """Test facets apply the same search and price filters as the listing"""
+        data = self.client.get(self.url, {'search': 'vario beat', 'max_price': '15000000'}).data
+        self.assertEqual(data['total'], 0)
+        data = self.client.get(self.url, {'search': 'beat', 'max_price': '15000000'}).data
+        self.assertEqual(data['total'], 1)
+
+    def test_facets_cached_per_filter_key(self):
+        """Test pagination and ordering params share the cached facets"""
+        self.client.get(self.url, {'search': 'honda'})
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'search': 'honda', 'ordering': 'price', 'page': '2'})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductAttributeFilterTest(ProductTestMixin, TestCase):
+    """Test cases for attr.<key> filters"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.category = self.create_category()
+        self.url = reverse('brokers:product-list')
+        self.create_product('Yamaha NMAX', attributes={'tahun': '2021', 'cc': '155', 'warna': 'Biru', 'seat': 2})
+        self.create_product('Honda Beat', attributes={'tahun': 2019, 'cc': '110', 'warna': 'Merah'})
+        self.create_product('Honda CBR', attributes={'tahun': 'lama', 'cc': '150cc', 'warna': 'Merah', 'seat': '1'})
+
+    def titles(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(item['title'] for item in response.data['results'])
+
+    def test_promoted_columns(self):
+        """Test promoted keys are generated as typed columns from strings and numbers"""
+        values = dict(Product.objects.values_list('title', 'attr_tahun'))
+        self.assertEqual(values, {'Yamaha NMAX': 2021, 'Honda Beat': 2019, 'Honda CBR': None})
+
+    def test_range_filters(self):
+        """Test numeric lookups on promoted and free-form keys"""
+        self.assertEqual(self.titles(**{'attr.tahun__gte': '2020'}), ['Yamaha NMAX'])
+        self.assertEqual(self.titles(**{'attr.cc__gte': '100', 'attr.cc__lt': '150'}), ['Honda Beat'])
+        self.assertEqual(self.titles(**{'attr.seat__gte': '1', 'attr.seat__lte': '1'}), ['Honda CBR'])
+
+    def test_exact_filters(self):
+        """Test exact, iexact and in lookups"""
+        self.assertEqual(self.titles(**{'attr.warna': 'Merah'}), ['Honda Beat', 'Honda CBR'])
+        self.assertEqual(self.titles(**{'attr.warna__iexact': 'biru'}), ['Yamaha NMAX'])
+        self.assertEqual(self.titles(**{'attr.tahun__in': '2019,lama'}), ['Honda Beat', 'Honda CBR'])
+        self.assertEqual(self.titles(**{'attr.seat': '2'}), ['Yamaha NMAX'])
+
+    def test_invalid_filters(self):
+        """Test unsupported keys, lookups and values are rejected"""
+        self.assertEqual(self.client.get(self.url, {'attr.tahun__regex': '.'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'attr.Bad-Key': '1'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'attr.tahun__gte': 'baru'}).status_code, 400)
+
+    def test_keys_named_like_lookups(self):
+        """Test keys such as contains or isnull are treated as attribute keys"""
+        self.create_product('Vespa', attributes={'contains': '1', 'isnull': 'x'})
+        for key in ['contains', 'contained_by', 'isnull', 'has_key']:
+            for lookup in ['', '__iexact', '__in', '__gte']:
+                response = self.client.get(self.url, {f'attr.{key}{lookup}': '1'})
+                self.assertEqual(response.status_code, 200, f'{key}{lookup}')
+        self.assertEqual(self.titles(**{'attr.contains': '1'}), ['Vespa'])
+        self.assertEqual(self.titles(**{'attr.isnull': 'x'}), ['Vespa'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryTreeTest(ProductTestMixin, TestCase):
+    """Test cases for the materialized category tree"""
+
+    def setUp(self):
+        cache.clear()
+        clear_local_tree()
+        self.root = self.create_category('Kendaraan')
+        self.motor = self.create_category('Motor', parent=self.root)
+        self.sport = self.create_category('Sport', parent=self.motor)
+        self.other = self.create_category('Properti')
+
+    def test_paths(self):
+        """Test paths and depths are maintained on create"""
+        self.sport.refresh_from_db()
+        self.assertEqual(self.sport.path, f'/{self.root.pk}/{self.motor.pk}/{self.sport.pk}/')
+        self.assertEqual(self.sport.depth, 2)
+        self.assertEqual(list(self.sport.get_ancestors()), [self.root, self.motor])
+
+    def test_move_subtree(self):
+        """Test moving a category rewrites the paths of its descendants"""
+        self.motor.parent = self.other
+        self.motor.save()
+        self.sport.refresh_from_db()
+        self.assertEqual(self.sport.path, f'/{self.other.pk}/{self.motor.pk}/{self.sport.pk}/')
+        self.assertEqual(self.root.get_all_children(), [])
+        self.assertEqual(self.other.get_all_children(), [self.motor, self.sport])
+
+    def test_cycle_rejected(self):
+        """Test a category cannot be moved below its own descendant"""
+        self.root.parent = self.sport
+        with self.assertRaises(ValidationError):
+            self.root.clean()
+        with self.assertRaises(ValueError):
+            self.root.save()
+        self.root.refresh_from_db()
+        self.assertEqual((self.root.parent_id, self.root.path), (None, f'/{self.root.pk}/'))
+
+    def test_full_path_without_queries(self):
+        """Test full paths come from the cached tree"""
+        sport = Category.objects.get(pk=self.sport.pk)
+        get_category_tree()
+        with self.assertNumQueries(0):
+            self.assertEqual(sport.full_path, 'Kendaraan > Motor > Sport')
+            self.assertEqual(str(sport), 'Motor > Sport')
+
+    def test_tree_invalidated_on_save(self):
+        """Test renaming a category refreshes the cached tree"""
+        get_category_tree()
+        self.root.name = 'Otomotif'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.root.save()
+            # Not before the transaction commits
+            self.assertEqual(get_category_tree().full_path(self.sport.pk), 'Kendaraan > Motor > Sport')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_category_tree().full_path(self.sport.pk), 'Otomotif > Motor > Sport')
+        self.assertEqual(
+            sorted(get_category_tree().descendant_ids(self.root.pk)),
+            sorted([self.root.pk, self.motor.pk, self.sport.pk]),
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryProductCountTest(ProductTestMixin, TestCase):
+    """Test cases for category product counts and the tree endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        clear_local_tree()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='secret')
+        self.client.force_authenticate(user=self.user)
+        self.root = self.create_category('Kendaraan')
+        self.category = self.create_category('Motor', parent=self.root)
+        self.create_category('Arsip', parent=self.root, is_active=False)
+        self.create_product('Honda Beat')
+        self.create_product('Yamaha NMAX')
+        self.create_product('Honda Supra', is_sold=True)
+        self.create_product('Suzuki Satria', is_active=False)
+
+    def test_list_counts_in_one_query(self):
+        """Test listing categories counts live products without a query per category"""
+        url = reverse('brokers:category-list')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        counts = {item['name']: item['product_count'] for item in response.data['results']}
+        self.assertEqual(counts, {'Kendaraan': 0, 'Motor': 2})
+
+        for index in range(5):
+            self.create_category(f'Kategori {index}')
+        cache.clear()
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 7)
+
+    def test_tree(self):
+        """Test the tree endpoint nests active categories with subtree counts"""
+        response = self.client.get(reverse('brokers:category-tree'))
+        self.assertEqual(response.status_code, 200)
+        root = next(node for node in response.data if node['name'] == 'Kendaraan')
+        self.assertEqual(root['product_count'], 0)
+        self.assertEqual(root['total_product_count'], 2)
+        self.assertEqual([child['name'] for child in root['children']], ['Motor'])
+
+    def test_tree_invalidated_on_product_change(self):
+        """Test the cached tree document reflects new products"""
+        self.client.get(reverse('brokers:category-tree'))
+        self.create_product('Kawasaki Ninja')
+        response = self.client.get(reverse('brokers:category-tree'))
+        root = next(node for node in response.data if node['name'] == 'Kendaraan')
+        self.assertEqual(root['total_product_count'], 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategorySubtreeFilterTest(ProductTestMixin, TestCase):
+    """Test cases for subtree-aware category browsing"""
+
+    def setUp(self):
+        cache.clear()
+        clear_local_tree()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='secret')
+        self.client.force_authenticate(user=self.user)
+        self.root = self.create_category('Kendaraan')
+        self.category = self.create_category('Motor', parent=self.root)
+        self.hidden = self.create_category('Arsip', parent=self.root, is_active=False)
+        self.create_product('Honda Beat')
+        self.create_product('Avanza', category=self.root)
+        self.create_product('Vespa Lama', category=self.hidden)
+        self.create_product('Rumah', category=self.create_category('Properti'))
+
+    def titles(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(item['title'] for item in response.data['results'])
+
+    def test_category_products_include_descendants(self):
+        """Test a parent category lists products of its active subcategories"""
+        url = reverse('brokers:category-products', kwargs={'slug': self.root.slug})
+        self.assertEqual(self.titles(url), ['Avanza', 'Honda Beat'])
+
+    def test_product_category_filter(self):
+        """Test ?category= accepts ids and slugs and includes subcategories"""
+        url = reverse('brokers:product-list')
+        self.assertEqual(self.titles(url, category=self.root.pk), ['Avanza', 'Honda Beat'])
+        self.assertEqual(self.titles(url, category=self.category.slug), ['Honda Beat'])
+        self.assertEqual(self.client.get(url, {'category': 'tidak-ada'}).status_code, 400)
+
+    def test_subtree_query_count_constant(self):
+        """Test the subtree is resolved from the cached tree, not per descendant"""
+        url = reverse('brokers:product-list')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'category': self.root.pk})
+        for index in range(5):
+            self.create_category(f'Sub {index}', parent=self.category)
+        with self.assertNumQueries(len(queries)):
+            self.client.get(url, {'category': self.root.pk})
+
+
+class ProductSlugTest(ProductTestMixin, TestCase):
+    """Test cases for product slug allocation"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', password='secret')
+        self.category = self.create_category()
+
+    def test_numbered_slugs(self):
+        """Test duplicate titles get increasing numeric suffixes"""
+        slugs = [self.create_product('Honda Beat 2020').slug for _ in range(3)]
+        self.assertEqual(slugs, ['honda-beat-2020', 'honda-beat-2020-1', 'honda-beat-2020-2'])
+        self.assertEqual(self.create_product('Honda Beat').slug, 'honda-beat')
+
+    def test_title_numbers_are_not_counters(self):
+        """Test a number from another title is not continued as a counter"""
+        self.create_product('Honda Beat')
+        self.create_product('Honda Beat 2020')
+        self.create_product('Honda Beat Street')
+        self.assertEqual(self.create_product('Honda Beat').slug, 'honda-beat-1')
+        self.assertEqual(self.create_product('Honda Beat').slug, 'honda-beat-2')
+
+    def test_constant_queries(self):
+        """Test slug allocation does not query once per existing duplicate"""
+        for _ in range(2):
+            self.create_product('Honda Beat 2020')
+        with CaptureQueriesContext(connection) as small:
+            self.create_product('Honda Beat 2020')
+        for _ in range(5):
+            self.create_product('Honda Beat 2020')
+        with self.assertNumQueries(len(small)):
+            product = self.create_product('Honda Beat 2020')
+        self.assertEqual(product.slug, 'honda-beat-2020-8')
+
+    def test_retry_on_conflict(self):
+        """Test a slug taken by a concurrent insert is allocated again"""
+        self.create_product('Honda Beat 2020')
+        allocate_slug = Product.allocate_slug
+        with mock.patch.object(Product, 'allocate_slug', side_effect=['honda-beat-2020', allocate_slug('honda-beat-2020')]):
+            product = self.create_product('Honda Beat 2020')
+        self.assertEqual(product.slug, 'honda-beat-2020-1')
+
+
+def make_image_file(name='foto.png', size=(8, 8)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MEDIA_ROOT=tempfile.mkdtemp())
+class ProductImageUploadTest(ProductTestMixin, TestCase):
+    """Test cases for batched product image uploads"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='secret')
+        self.client.force_authenticate(user=self.user)
+        self.category = self.create_category()
+
+    def create_with_images(self, count):
+        data = {
+            'title': 'Honda Beat 2020',
+            'category': self.category.pk,
+            'condition': 'good',
+            'price': '15000000',
+            'location_city': 'Bandung',
+            'location_province': 'Jawa Barat',
+            'contact_name': 'Seller',
+            'contact_phone': '081234567890',
+            'description': 'Kondisi terawat',
+            'uploaded_images': [make_image_file(f'foto{index}.png') for index in range(count)],
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('brokers:product-list'), data, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Product.objects.order_by('-pk').first(), len(queries)
+
+    def test_images_batched(self):
+        """Test uploading more images does not add queries per image"""
+        _, one = self.create_with_images(1)
+        product, many = self.create_with_images(5)
+        self.assertEqual(one, many)
+        images = list(product.images.order_by('order'))
+        self.assertEqual([image.order for image in images], [0, 1, 2, 3, 4])
+        self.assertEqual([image.is_main for image in images], [True, False, False, False, False])
+        self.assertTrue(all(image.image.storage.exists(image.image.name) for image in images))
+
+    def test_image_cap(self):
+        """Test updates that would exceed the image cap are rejected"""
+        product, _ = self.create_with_images(8)
+        url = reverse('brokers:product-detail', kwargs={'slug': product.slug})
+        data = {'uploaded_images': [make_image_file(f'baru{index}.png') for index in range(3)]}
+        response = self.client.patch(url, data, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(product.images.count(), 8)
+        data = {'uploaded_images': [make_image_file(f'baru{index}.png') for index in range(2)]}
+        response = self.client.patch(url, data, format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(sorted(product.images.values_list('order', flat=True)), list(range(10)))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MEDIA_ROOT=tempfile.mkdtemp())
+class ProductImageVariantTest(ProductTestMixin, TestCase):
+    """Test cases for resized product image variants"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='secret')
+        self.category = self.create_category()
+        self.product = self.create_product()
+        buffer = BytesIO()
+        Image.new('RGB', (3000, 2000), 'blue').save(buffer, format='JPEG')
+        self.image = ProductImage.objects.create(
+            product=self.product,
+            image=SimpleUploadedFile('foto.jpg', buffer.getvalue(), content_type='image/jpeg'),
+            is_main=True,
+        )
+
+    def test_generate_variants(self):
+        """Test variants are bounded, stored and recorded on the image"""
+        self.assertTrue(update_image_variants(self.image.pk))
+        self.image.refresh_from_db()
+        self.assertEqual(
+            {name: (data['width'], data['height']) for name, data in self.image.variants.items()},
+            {'card': (400, 267), 'gallery': (1024, 683), 'zoom': (2048, 1365)},
+        )
+        storage = self.image.image.storage
+        with storage.open(self.image.variants['card']['webp']) as file:
+            self.assertEqual(Image.open(file).format, 'WEBP')
+
+    def test_replaced_image_not_overwritten(self):
+        """Test variants rendered for a replaced file are not recorded"""
+        def replace_while_rendering(product_image):
+            ProductImage.objects.filter(pk=product_image.pk).update(image='products/baru.jpg')
+            return {'card': {'width': 400, 'height': 267}}
+
+        with mock.patch('brokers.variants.generate_variants', side_effect=replace_while_rendering):
+            self.assertFalse(update_image_variants(self.image.pk))
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.variants, {})
+
+    def test_serializers_prefer_variants(self):
+        """Test list cards use the card variant and expose a srcset"""
+        response = self.client.get(reverse('brokers:product-list'))
+        self.assertEqual(response.data['results'][0]['main_image']['src'], f'http://testserver{self.image.image.url}')
+
+        update_image_variants(self.image.pk)
+        response = self.client.get(reverse('brokers:product-list'))
+        card = response.data['results'][0]['main_image']
+        self.assertTrue(card['src'].endswith('-card.jpeg'))
+        self.assertIn('400w', card['srcset']['webp'])
+        self.assertIn('2048w', card['srcset']['jpeg'])
+
+    def test_size_and_placeholder(self):
+        """Test size is stored at upload, the placeholder with the variants, both serialized inline"""
+        self.assertEqual((self.image.width, self.image.height), (3000, 2000))
+        self.assertEqual(self.image.placeholder, '')
+        update_image_variants(self.image.pk)
+        self.image.refresh_from_db()
+        self.assertTrue(self.image.placeholder.startswith('data:image/webp;base64,'))
+        self.assertLess(len(self.image.placeholder), 1000)
+        card = self.client.get(reverse('brokers:product-list')).data['results'][0]['main_image']
+        self.assertEqual((card['width'], card['height']), (3000, 2000))
+        self.assertEqual(card['placeholder'], self.image.placeholder)
+
+    def test_upload_reads_header_only(self):
+        """Test the upload path reads the size of a PNG without decoding its pixels"""
+        with mock.patch.object(ImageFile.ImageFile, 'load', side_effect=AssertionError('decoded')):
+            image = ProductImage.objects.create(product=self.product, image=make_image_file(size=(30, 20)))
+        self.assertEqual((image.width, image.height, image.placeholder), (30, 20, ''))
+
+    def test_backfill_placeholders(self):
+        """Test the backfill command fills in images uploaded without a size"""
+        ProductImage.objects.update(width=None, height=None, placeholder='')
+        call_command('backfill_image_placeholders', stdout=StringIO())
+        self.image.refresh_from_db()
+        self.assertEqual((self.image.width, self.image.height), (3000, 2000))
+        self.assertTrue(self.image.placeholder)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MEDIA_ROOT=tempfile.mkdtemp())
+class ContentAddressedImageTest(ProductTestMixin, TestCase):
+    """Test cases for deduplicated product image storage"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='secret')
+        self.category = self.create_category()
+
+    def add_image(self, product, color='red'):
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), color).save(buffer, format='PNG')
+        return ProductImage.objects.create(
+            product=product, image=SimpleUploadedFile('Foto.PNG', buffer.getvalue(), content_type='image/png')
+        )
+
+    def test_identical_uploads_share_blob(self):
+        """Test identical files are stored once under a sharded hash path"""
+        first = self.add_image(self.create_product('Honda Beat'))
+        second = self.add_image(self.create_product('Honda Vario'))
+        other = self.add_image(self.create_product('Honda Scoopy'), color='blue')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        digest = first.image.name.rsplit('/', 1)[-1].split('.')[0]
+        self.assertEqual(first.image.name, f'products/{digest[:2]}/{digest[2:4]}/{digest}.png')
+
+    def test_blob_deleted_with_last_reference(self):
+        """Test a shared blob is only deleted when its last image is deleted"""
+        first = self.add_image(self.create_product('Honda Beat'))
+        second = self.add_image(self.create_product('Honda Vario'))
+        storage = first.image.storage
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(storage.exists(second.image.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.product.delete()
+        self.assertFalse(storage.exists(second.image.name))
+
+    def test_failed_attach_keeps_shared_blob(self):
+        """Test a failed batch only removes blobs no other image uses"""
+        first = self.add_image(self.create_product('Honda Beat'))
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), 'red').save(buffer, format='PNG')
+        files = [
+            SimpleUploadedFile('Foto.PNG', buffer.getvalue(), content_type='image/png'),
+            make_image_file(size=(9, 9)),
+        ]
+        new_name = content_addressed_name('products', content_hash(files[1]), 'png')
+        product = self.create_product('Honda Vario')
+        with mock.patch.object(ProductImage.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                attach_images(product, files)
+        storage = first.image.storage
+        self.assertTrue(storage.exists(first.image.name))
+        self.assertFalse(storage.exists(new_name))
+
+    def test_released_blob_restored_by_upload(self):
+        """Test an upload re-creates a shared blob released after storage found it"""
+        first = self.add_image(self.create_product('Honda Beat'))
+        storage = first.image.storage
+        save = storage.save
+
+        def save_then_release(name, content, max_length=None):
+            saved = save(name, content, max_length=max_length)
+            if first.pk:
+                # The last other reference is deleted before this upload's insert
+                with self.captureOnCommitCallbacks(execute=True):
+                    first.delete()
+                self.assertFalse(storage.exists(saved))
+            return saved
+
+        with mock.patch.object(storage, 'save', side_effect=save_then_release):
+            second = self.add_image(self.create_product('Honda Vario'))
+        self.assertTrue(storage.exists(second.image.name))
+
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MEDIA_ROOT=tempfile.mkdtemp())
+class ImageUploadValidationTest(ProductTestMixin, TestCase):
+    """Test cases for header-only image upload validation"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='secret')
+        self.client.force_authenticate(user=self.user)
+        self.category = self.create_category()
+        self.url = reverse('brokers:product-detail', kwargs={'slug': self.create_product().slug})
+
+    def post_image(self, upload):
+        return self.client.patch(self.url, {'uploaded_images': [upload]}, format='multipart')
+
+    def test_valid_image(self):
+        """Test a small image within the limits is accepted"""
+        self.assertEqual(self.post_image(make_image_file()).status_code, 200)
+
+    def test_multi_picture_jpeg(self):
+        """Test camera JPEGs with embedded pictures (MPO) are accepted"""
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), 'red').save(buffer, format='MPO', save_all=True, append_images=[Image.new('RGB', (4, 4))])
+        self.assertEqual(Image.open(BytesIO(buffer.getvalue())).format, 'MPO')
+        upload = SimpleUploadedFile('foto.jpg', buffer.getvalue(), content_type='image/jpeg')
+        self.assertEqual(self.post_image(upload).status_code, 200)
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=100)
+    def test_pixel_limit(self):
+        """Test images above the pixel limit are rejected before decoding"""
+        response = self.post_image(make_image_file(size=(20, 10)))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ProductImage.objects.count(), 0)
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=10)
+    def test_byte_limit(self):
+        """Test files above the byte limit are rejected"""
+        self.assertEqual(self.post_image(make_image_file()).status_code, 400)
+
+    def test_invalid_files(self):
+        """Test non-images and unsupported formats are rejected"""
+        self.assertEqual(self.post_image(SimpleUploadedFile('foto.png', b'bukan gambar')).status_code, 400)
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8)).save(buffer, format='BMP')
+        self.assertEqual(self.post_image(SimpleUploadedFile('foto.bmp', buffer.getvalue())).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductImportTest(ProductTestMixin, TestCase):
+    """Test cases for bulk product import"""
+
+    header = 'title,category,condition,price,location_city,location_province,contact_name,contact_phone,description,attr.tahun\n'
+
+    def setUp(self):
+        cache.clear()
+        clear_local_tree()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='dealer', password='secret')
+        self.client.force_authenticate(user=self.user)
+        self.category = self.create_category()
+        self.create_product('Honda Beat 2020')
+
+    def csv_row(self, title, category=None, price='15000000'):
+        category = category or self.category.slug
+        return f'{title},{category},good,{price},Bandung,Jawa Barat,Dealer,0812,Unit siap pakai,2020\n'
+
+    def test_csv_endpoint(self):
+        """Test CSV import creates valid rows with batched slugs and reports bad rows"""
+        content = self.header + ''.join([
+            self.csv_row('Honda Beat 2020'),
+            self.csv_row('Honda Beat 2020'),
+            self.csv_row('Yamaha NMAX', category=self.category.pk),
+            self.csv_row('Tanpa Kategori', category='tidak-ada'),
+            self.csv_row('Harga Salah', price='murah'),
+        ])
+        upload = SimpleUploadedFile('dealer.csv', content.encode(), content_type='text/csv')
+        response = self.client.post(reverse('brokers:product-bulk-import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['created'], response.data['failed'], response.data['last_row']), (3, 2, 5))
+        self.assertEqual([error['row'] for error in response.data['errors']], [4, 5])
+        self.assertIn('category', response.data['errors'][0]['errors'])
+        self.assertEqual(
+            sorted(Product.objects.filter(title='Honda Beat 2020').values_list('slug', flat=True)),
+            ['honda-beat-2020', 'honda-beat-2020-1', 'honda-beat-2020-2'],
+        )
+        nmax = Product.objects.get(title='Yamaha NMAX')
+        self.assertEqual((nmax.seller, nmax.attr_tahun), (self.user, 2020))
+
+    def test_command_resumes_from_checkpoint(self):
+        """Test the command writes a checkpoint and skips imported rows when resumed"""
+        directory = tempfile.mkdtemp()
+        path, checkpoint = f'{directory}/dealer.jsonl', f'{directory}/checkpoint.json'
+        record = {
+            'category': self.category.slug, 'condition': 'good', 'price': '1000000',
+            'location_city': 'Bandung', 'location_province': 'Jawa Barat',
+            'contact_name': 'Dealer', 'contact_phone': '0812', 'description': 'Unit',
+        }
+        with open(path, 'w') as file:
+            for index in range(5):
+                file.write(json.dumps({**record, 'title': f'Motor {index}'}) + '\n')
+            file.write('{bukan json\n')
+
+        options = {'seller': 'dealer', 'checkpoint': checkpoint, 'chunk_size': 2, 'stdout': StringIO(), 'stderr': StringIO()}
+        call_command('import_products', path, **options)
+        self.assertEqual(Product.objects.filter(title__startswith='Motor').count(), 5)
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file)['last_row'], 6)
+
+        with open(path, 'a') as file:
+            file.write(json.dumps({**record, 'title': 'Motor 5'}) + '\n')
+        call_command('import_products', path, **options)
+        self.assertEqual(Product.objects.filter(title__startswith='Motor').count(), 6)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductExportTest(ProductTestMixin, TestCase):
+    """Test cases for streaming exports"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='secret')
+        self.client.force_authenticate(user=self.user)
+        self.category = self.create_category()
+        self.product = self.create_product('Honda Beat, "Mulus"', attributes={'tahun': 2020})
+        self.create_product('Yamaha NMAX')
+        other = User.objects.create_user(username='other', password='secret')
+        self.create_product('Bukan Milik Saya', seller=other)
+        ProductInquiry.objects.create(product=self.product, inquirer_name='Budi', message='Masih ada?')
+        self.url = reverse('brokers:product-export')
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        """Test CSV export streams only the seller's products"""
+        rows = list(csv.DictReader(StringIO(self.export(export_format='csv'))))
+        self.assertEqual([row['title'] for row in rows], ['Honda Beat, "Mulus"', 'Yamaha NMAX'])
+        self.assertEqual(json.loads(rows[0]['attributes']), {'tahun': 2020})
+        self.assertEqual(rows[0]['category'], 'motor')
+
+    def test_csv_formulas_escaped(self):
+        """Test CSV cells a spreadsheet would run as formulas are quoted, JSON Lines is not"""
+        self.create_product('=HYPERLINK("http://contoh.com")', contact_phone='+6281234567890')
+        rows = list(csv.DictReader(StringIO(self.export(export_format='csv'))))
+        self.assertEqual(rows[-1]['title'], '\'=HYPERLINK("http://contoh.com")')
+        self.assertEqual(rows[-1]['contact_phone'], "'+6281234567890")
+        self.assertFalse(rows[0]['price'].startswith("'"))
+        record = json.loads(self.export(export_format='jsonl').splitlines()[-1])
+        self.assertEqual(record['title'], '=HYPERLINK("http://contoh.com")')
+
+    def test_jsonl_datasets(self):
+        """Test JSON Lines export of products filtered like the list, and of inquiries"""
+        lines = self.export(export_format='jsonl', search='nmax').splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['Yamaha NMAX'])
+        lines = self.export(export_format='jsonl', dataset='inquiries').splitlines()
+        self.assertEqual(json.loads(lines[0])['inquirer_name'], 'Budi')
+        self.assertEqual(self.client.get(self.url, {'dataset': 'users'}).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MEDIA_ROOT=tempfile.mkdtemp())
+class GenerateLoadDataTest(TestCase):
+    """Test cases for the synthetic load data generator"""
+
+    def generate(self, **options):
+        options = {'products': 40, 'views': 200, 'images_per_product': 2, 'sellers': 5, 'workers': 1, **options}
+        call_command('generate_load_data', seed=7, categories_depth=2, categories_per_level=3,
+                     batch_size=25, stdout=StringIO(), **options)
+
+    def test_generate(self):
+        """Test products land in leaf categories with images and consistent view counts"""
+        self.generate()
+        self.assertEqual(Product.objects.count(), 40)
+        self.assertEqual(Category.objects.filter(depth=1).count(), 9)
+        self.assertFalse(Product.objects.exclude(category__depth=1).exists())
+        self.assertEqual(ProductView.objects.count(), 200)
+        self.assertEqual(sum(Product.objects.values_list('view_count', flat=True)), 200)
+        self.assertTrue(ProductImage.objects.filter(is_main=True, width=1200).exists())
+        self.assertLessEqual(len(set(ProductImage.objects.values_list('image', flat=True))), 12)
+
+    def test_rerun_adds_rows(self):
+        """Test a second run with the same seed reuses categories and adds new products"""
+        self.generate(views=0, images_per_product=0)
+        self.generate(views=0, images_per_product=0)
+        self.assertEqual(Product.objects.count(), 80)
+        self.assertEqual(Category.objects.count(), 12)
@@ -0,0 +1,173 @@
+"""
+Cached, fully built in-memory category tree.
+
+The whole hierarchy is loaded with one query, stored in the cache under the
+current category generation (see ``brokers.cache``) and memoized per process,
+so ``Category.full_path``, ``__str__`` and descendant lookups do not touch the
+database. Once a category change commits, ``invalidate_category_tree`` bumps
+the generation, which retires the cached tree.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from django.core.cache import cache
+from django.db.models import Count
+from .cache import CATEGORY, bump_generation, get_generations
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+TREE_KEY = 'brokers:category_tree:{}'
+
+# Trees of retired generations are never read again; let them expire
+TREE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# How long a process reuses its tree before re-checking the generation
+TREE_CHECK_INTERVAL = 1.0
+
+
+@dataclass
+class CategoryNode:
+    id: int
+    name: str
+    slug: str
+    parent_id: int | None
+    path: str
+    depth: int
+    icon: str
+    color: str
+    sort_order: int
+    is_active: bool
+    children: list = field(default_factory=list)
+
+
+class CategoryTree:
+    """Category hierarchy indexed by id"""
+
+    fields = ['id', 'name', 'slug', 'parent_id', 'path', 'depth', 'icon', 'color', 'sort_order', 'is_active']
+
+    def __init__(self, rows):
+        self.nodes = {row['id']: CategoryNode(**row) for row in rows}
+        self.slugs = {node.slug: node.id for node in self.nodes.values()}
+        self.roots = []
+        for node in sorted(self.nodes.values(), key=lambda node: (node.sort_order, node.name)):
+            parent = self.nodes.get(node.parent_id)
+            (parent.children if parent else self.roots).append(node)
+
+    @classmethod
+    def load(cls):
+        return list(Category.objects.order_by().values(*cls.fields))
+
+    def get(self, category_id):
+        return self.nodes.get(category_id)
+
+    def get_by_slug(self, slug):
+        return self.nodes.get(self.slugs.get(slug))
+
+    def ancestors(self, category_id):
+        """Ancestor nodes, root first"""
+        node = self.nodes.get(category_id)
+        if node is None:
+            return []
+        ids = [int(part) for part in node.path.strip('/').split('/')[:-1] if part]
+        return [self.nodes[ancestor_id] for ancestor_id in ids if ancestor_id in self.nodes]
+
+    def full_path(self, category_id):
+        """"Parent > Child" path of a category, or None if unknown"""
+        node = self.nodes.get(category_id)
+        if node is None:
+            return None
+        return ' > '.join(ancestor.name for ancestor in self.ancestors(category_id) + [node])
+
+    def descendant_ids(self, category_id, include_self=True, active_only=False):
+        """
+        Ids of the whole subtree below a category. With ``active_only``,
+        inactive categories are skipped together with their descendants.
+        """
+        node = self.nodes.get(category_id)
+        if node is None:
+            return []
+        ids = [node.id] if include_self else []
+        stack = list(node.children)
+        while stack:
+            child = stack.pop()
+            if active_only and not child.is_active:
+                continue
+            ids.append(child.id)
+            stack.extend(child.children)
+        return ids
+
+
+_local = {'generation': None, 'checked_at': 0.0, 'tree': None}
+
+
+def get_category_tree():
+    """The current category tree, from process memory, the cache or the database"""
+    now = time.monotonic()
+    if _local['tree'] is not None and now - _local['checked_at'] < TREE_CHECK_INTERVAL:
+        return _local['tree']
+
+    try:
+        generation = get_generations(CATEGORY)[CATEGORY]
+    except Exception:
+        logger.warning('Category tree cache unavailable', exc_info=True)
+        return CategoryTree(CategoryTree.load())
+
+    if _local['tree'] is None or _local['generation'] != generation:
+        key = TREE_KEY.format(generation)
+        rows = cache.get(key)
+        if rows is None:
+            rows = CategoryTree.load()
+            cache.set(key, rows, timeout=TREE_CACHE_TIMEOUT)
+        _local['tree'] = CategoryTree(rows)
+        _local['generation'] = generation
+    _local['checked_at'] = now
+    return _local['tree']
+
+
+def clear_local_tree():
+    """Forget this process's memoized tree (called when categories change)"""
+    _local['tree'] = None
+
+
+def invalidate_category_tree():
+    """
+    Retire cached category responses and trees. Run it with
+    ``transaction.on_commit``: bumping earlier lets concurrent readers cache
+    pre-commit paths under the new generation.
+    """
+    bump_generation(CATEGORY)
+    clear_local_tree()
+
+
+def build_category_tree_document():
+    """
+    Nested active categories with live product counts, built from the cached
+    tree and one grouped product query. ``product_count`` counts a category's
+    own products, ``total_product_count`` includes its whole subtree.
+    Inactive categories are left out together with their descendants.
+    """
+    counts = dict(
+        Product.objects.filter(is_active=True, is_sold=False)
+        .order_by()
+        .values('category_id')
+        .annotate(count=Count('pk'))
+        .values_list('category_id', 'count')
+    )
+
+    def build(node):
+        children = [build(child) for child in node.children if child.is_active]
+        own_count = counts.get(node.id, 0)
+        return {
+            'id': node.id,
+            'name': node.name,
+            'slug': node.slug,
+            'icon': node.icon,
+            'color': node.color,
+            'depth': node.depth,
+            'product_count': own_count,
+            'total_product_count': own_count + sum(child['total_product_count'] for child in children),
+            'children': children,
+        }
+
+    return [build(root) for root in get_category_tree().roots if root.is_active]
@@ -0,0 +1,155 @@
+"""
+Resized product image variants.
+
+Every ``ProductImage`` gets fixed-size variants (``card``, ``gallery`` and
+``zoom``) in WebP and JPEG, plus AVIF when Pillow was built with it. They
+are generated off the request path by ``brokers.tasks.generate_image_variants``
+together with the ``placeholder`` and recorded in ``ProductImage.variants``
+as storage names:
+
+    {"card": {"width": 400, "height": 300, "webp": "...", "jpeg": "..."}, ...}
+
+Serializers pick the smallest adequate variant and expose a ``srcset``.
+"""
+import logging
+import os
+from io import BytesIO
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from .cache import PRODUCT, bump_generation
+from .models import ProductImage
+from .placeholders import render_placeholder
+
+logger = logging.getLogger(__name__)
+
+# Bounding boxes, smallest first
+VARIANT_SIZES = {
+    'card': (400, 400),
+    'gallery': (1024, 1024),
+    'zoom': (2048, 2048),
+}
+
+# Output formats with their Pillow save options, most preferred first
+VARIANT_FORMATS = {
+    'avif': ('AVIF', {'quality': 60}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+if '.avif' not in Image.registered_extensions():
+    del VARIANT_FORMATS['avif']
+
+
+def variant_name(image_name, variant, extension):
+    """Storage name of a variant: ``products/<slug>/variants/<stem>-<variant>.<ext>``"""
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{stem}-{variant}.{extension}')
+
+
+def open_for_size(file, size):
+    """
+    Open an image as RGB, decoded at no more than needed for ``size``. JPEG
+    files are decoded at a reduced scale with ``draft()``, which is much
+    faster than decoding the full photo and resizing afterwards.
+    """
+    source = Image.open(file)
+    source.draft('RGB', size)
+    source = ImageOps.exif_transpose(source)
+    if source.mode == 'RGB':
+        return source
+    if source.mode in ('RGBA', 'LA') or 'transparency' in source.info:
+        # Flatten transparency onto white, JPEG has no alpha channel
+        rgba = source.convert('RGBA')
+        background = Image.new('RGB', rgba.size, 'white')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    return source.convert('RGB')
+
+
+def render_variants(file):
+    """
+    Render all variants of an image file.
+    Returns ``{variant: (width, height, {extension: bytes})}``.
+    """
+    largest = max(VARIANT_SIZES.values())
+    source = open_for_size(file, largest)
+
+    rendered = {}
+    # Largest first, so each variant is reduced from the previous one
+    for variant, size in sorted(VARIANT_SIZES.items(), key=lambda item: item[1], reverse=True):
+        source = source.copy()
+        source.thumbnail(size, Image.LANCZOS, reducing_gap=2.0)
+        encoded = {}
+        for extension, (format, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            source.save(buffer, format=format, **options)
+            encoded[extension] = buffer.getvalue()
+        rendered[variant] = (source.width, source.height, encoded)
+    return rendered
+
+
+def generate_variants(product_image):
+    """Render and store the variants of a ``ProductImage``, returning their mapping"""
+    field = product_image.image
+    storage = field.storage
+    with storage.open(field.name, 'rb') as file:
+        rendered = render_variants(file)
+
+    variants = {}
+    for variant, (width, height, encoded) in rendered.items():
+        variants[variant] = {'width': width, 'height': height}
+        for extension, content in encoded.items():
+            name = variant_name(field.name, variant, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            variants[variant][extension] = storage.save(name, ContentFile(content))
+    return variants
+
+
+def update_image_variants(image_id, reuse=True):
+    """
+    Generate the variants and placeholder of one ``ProductImage`` and record
+    them on its row. With ``reuse``, variants already generated for another
+    row sharing the same blob are copied instead. Returns False if the image
+    no longer exists, was replaced meanwhile or cannot be decoded.
+    """
+    product_image = ProductImage.objects.filter(pk=image_id).first()
+    if product_image is None or not product_image.image:
+        return False
+
+    # Rows sharing a blob (see brokers.storage) share its variants too
+    variants, placeholder = reuse and (
+        ProductImage.objects.filter(image=product_image.image.name, variants__has_key=next(iter(VARIANT_SIZES)))
+        .exclude(pk=image_id)
+        .values_list('variants', 'placeholder')
+        .first()
+    ) or (None, '')
+    if not variants:
+        try:
+            variants = generate_variants(product_image)
+        except (OSError, Image.DecompressionBombError):
+            logger.warning('Could not generate variants for product image %s', image_id, exc_info=True)
+            return False
+    if not placeholder:
+        with product_image.image.storage.open(product_image.image.name, 'rb') as file:
+            placeholder = render_placeholder(file)
+    # The file may have been replaced while rendering; its own task records it
+    updated = ProductImage.objects.filter(pk=image_id, image=product_image.image.name).update(
+        variants=variants, placeholder=placeholder,
+    )
+    if not updated:
+        return False
+    bump_generation(PRODUCT)
+    return True
+
+
+def variant_urls(product_image):
+    """``{variant: {'width', 'height', extension: url}}`` of the stored variants"""
+    storage = product_image.image.storage
+    urls = {}
+    for variant, data in (product_image.variants or {}).items():
+        urls[variant] = {
+            key: storage.url(value) if key in VARIANT_FORMATS else value
+            for key, value in data.items()
+        }
+    return urls
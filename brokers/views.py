@@ -1,9 +1,17 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
-from django.db.models import Q
-from .models import Category, Product, ProductView, ProductInquiry
+from .analytics import record_product_view
+from .cache import PRODUCT, CATEGORY, cache_response
+from .conditional import aggregate_validators, compute_validators, conditional_response
+from .export import EXPORT_FORMATS, export_response
+from .facets import compute_facets
+from .filters import ProductSearchFilter, ProductOrderingFilter, ProductAttributeFilter, ProductCategoryFilter
+from .importer import IMPORT_FORMATS, ProductImporter, detect_format, read_records
+from .pagination import ProductPagination
+from .tree import build_category_tree_document, get_category_tree
+from .models import Category, Product, ProductInquiry, ProductView
 from .serializers import (
     CategorySerializer, ProductListSerializer, ProductDetailSerializer,
     ProductCreateUpdateSerializer, ProductInquirySerializer
@@ -17,26 +25,54 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.filter(is_active=True).order_by('sort_order', 'name')
     serializer_class = CategorySerializer
     lookup_field = 'slug'
+    pagination_class = ProductPagination
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            queryset = queryset.with_product_count()
+        return queryset
+    
+    @conditional_response('get_list_validators')
+    @cache_response(CATEGORY, PRODUCT)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @conditional_response('get_detail_validators')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    def get_list_validators(self, request, *args, **kwargs):
+        values = aggregate_validators(self.filter_queryset(self.get_queryset()))
+        return compute_validators(request, values, CATEGORY, PRODUCT)
+    
+    def get_detail_validators(self, request, slug=None):
+        values = list(self.get_queryset().filter(slug=slug).values_list('updated_at', flat=True))
+        if not values:
+            return None, None
+        return compute_validators(request, values, CATEGORY, PRODUCT)
+    
+    @action(detail=False, methods=['get'])
+    @cache_response(CATEGORY, PRODUCT)
+    def tree(self, request):
+        """Get the whole active category hierarchy with live product counts"""
+        return Response(build_category_tree_document())
     
     @action(detail=True, methods=['get'])
     def products(self, request, slug=None):
-        """Get products in this category"""
+        """Get products in this category and its subcategories"""
         category = self.get_object()
+        category_ids = get_category_tree().descendant_ids(category.pk, active_only=True) or [category.pk]
         products = Product.objects.filter(
-            category=category,
+            category_id__in=category_ids,
             is_active=True,
             is_sold=False
-        ).order_by('-is_featured', '-created_at')
+        ).with_card_data().order_by('-is_featured', '-created_at')
         
         # Apply filters
-        search = request.query_params.get('search')
+        search = request.query_params.get('search', '').strip()
         if search:
-            products = products.filter(
-                Q(title__icontains=search) |
-                Q(brand__icontains=search) |
-                Q(model__icontains=search) |
-                Q(description__icontains=search)
-            )
+            products = products.search(search).order_by('-search_rank', '-is_featured', '-created_at')
         
         # Apply price filter
         min_price = request.query_params.get('min_price')
@@ -63,7 +99,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.filter(is_active=True).order_by('-is_featured', '-created_at')
     permission_classes = [IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = ProductPagination
+    filter_backends = [ProductSearchFilter, ProductCategoryFilter, ProductAttributeFilter, ProductOrderingFilter]
     filterset_fields = ['category', 'condition', 'location_province', 'currency', 'is_negotiable']
     search_fields = ['title', 'brand', 'model', 'description', 'location_city']
     ordering_fields = ['price', 'created_at']
@@ -78,6 +115,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.with_card_data()
         
         # Filter by sold status
         show_sold = self.request.query_params.get('show_sold', 'false').lower()
@@ -97,24 +136,45 @@ class ProductViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user)
     
+    @cache_response(PRODUCT, CATEGORY)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
     def retrieve(self, request, *args, **kwargs):
         """Override retrieve to track views"""
-        response = super().retrieve(request, *args, **kwargs)
+        response = self.cached_retrieve(request, *args, **kwargs)
         
-        # Track view
-        product = self.get_object()
-        ip_address = self.get_client_ip(request)
-        session_key = request.session.session_key or 'anonymous'
-        
-        ProductView.objects.get_or_create(
-            product=product,
-            ip_address=ip_address,
-            session_key=session_key,
-            defaults={'user_agent': request.META.get('HTTP_USER_AGENT', '')}
-        )
+        # Track view: queued and stored in bulk by brokers.tasks.flush_product_views
+        if response.status_code == 200:
+            record_product_view(
+                response.data['id'],
+                ip_address=self.get_client_ip(request),
+                session_key=request.session.session_key or 'anonymous',
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            )
         
         return response
     
+    def get_detail_validators(self, request, slug=None):
+        values = list(
+            self.filter_queryset(self.get_queryset()).filter(slug=slug)
+            .values_list('updated_at', 'category__updated_at')[:1]
+        )
+        if not values:
+            return None, None
+        return compute_validators(request, list(values[0]), PRODUCT, CATEGORY)
+    
+    def get_featured_validators(self, request):
+        values = aggregate_validators(self.get_featured_queryset())
+        return compute_validators(request, values, PRODUCT, CATEGORY)
+    
+    @conditional_response('get_detail_validators')
+    @cache_response(PRODUCT, CATEGORY)
+    def cached_retrieve(self, request, *args, **kwargs):
+        product = self.get_object()
+        serializer = self.get_serializer(product)
+        return Response(serializer.data)
+    
     def get_client_ip(self, request):
         """Get client IP address"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -170,7 +230,7 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_products(self, request):
         """Get current user's products"""
-        products = Product.objects.filter(seller=request.user).order_by('-created_at')
+        products = Product.objects.filter(seller=request.user).with_card_data().order_by('-created_at')
         
         page = self.paginate_queryset(products)
         if page is not None:
@@ -181,13 +241,76 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
-    def featured(self, request):
-        """Get featured products"""
-        products = Product.objects.filter(
+    @cache_response(PRODUCT, CATEGORY, exclude_params=('page', 'cursor', 'ordering'))
+    def facets(self, request):
+        """Get facet counts for the current search and filters"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(compute_facets(queryset))
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def bulk_import(self, request):
+        """
+        Import products for the current user from an uploaded CSV or JSON Lines
+        ``file``. ``import_format`` overrides detection from the file name and
+        ``resume_after`` skips rows already imported by an interrupted run.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['This field is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        import_format = request.data.get('import_format') or detect_format(upload.name)
+        if import_format not in IMPORT_FORMATS:
+            return Response(
+                {'import_format': [f'Expected one of: {", ".join(IMPORT_FORMATS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            resume_after = int(request.data.get('resume_after') or 0)
+        except ValueError:
+            return Response({'resume_after': ['Expected an integer.']}, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = ProductImporter(request.user).run(read_records(upload.file, import_format), resume_after=resume_after)
+        return Response(result.as_dict())
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """
+        Stream the current user's ``products`` (filtered like the list),
+        ``inquiries`` or ``views`` (``dataset``) as CSV or JSON Lines
+        (``export_format``).
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'export_format': [f'Expected one of: {", ".join(EXPORT_FORMATS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        dataset = request.query_params.get('dataset', 'products')
+        if dataset == 'products':
+            queryset = self.filter_queryset(Product.objects.filter(seller=request.user))
+        elif dataset == 'inquiries':
+            queryset = ProductInquiry.objects.filter(product__seller=request.user)
+        elif dataset == 'views':
+            queryset = ProductView.objects.filter(product__seller=request.user)
+        else:
+            return Response(
+                {'dataset': ['Expected one of: products, inquiries, views.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return export_response(queryset, export_format)
+    
+    def get_featured_queryset(self):
+        return Product.objects.filter(
             is_active=True,
             is_sold=False,
             is_featured=True
-        ).order_by('-created_at')[:20]
+        )
+    
+    @action(detail=False, methods=['get'])
+    @conditional_response('get_featured_validators')
+    @cache_response(PRODUCT, CATEGORY)
+    def featured(self, request):
+        """Get featured products"""
+        products = self.get_featured_queryset().with_card_data().order_by('-created_at')[:20]
         
         serializer = ProductListSerializer(products, many=True, context={'request': request})
         return Response(serializer.data)
@@ -0,0 +1,73 @@
+"""
+Cache backends that report hits, misses and time to the request being
+instrumented by ``core.middleware.RequestTimingMiddleware``. Outside a
+sampled request every call goes straight to the underlying backend.
+"""
+import time
+from django.core.cache.backends.locmem import LocMemCache
+from django_redis.cache import RedisCache
+from .middleware import current_metrics
+
+MISSING = object()
+
+
+def timed(name):
+    """Cache method that only adds its duration to the request metrics"""
+    def method(self, *args, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return getattr(super(InstrumentedCacheMixin, self), name)(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return getattr(super(InstrumentedCacheMixin, self), name)(*args, **kwargs)
+        finally:
+            metrics.record_cache(started)
+    method.__name__ = name
+    return method
+
+
+class InstrumentedCacheMixin:
+    """Count hits and misses of reads and time every cache call"""
+
+    def get(self, key, default=None, version=None, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return super().get(key, default, version=version, **kwargs)
+        started = time.perf_counter()
+        value = MISSING
+        try:
+            value = super().get(key, MISSING, version=version, **kwargs)
+        finally:
+            hit = value is not MISSING
+            metrics.record_cache(started, hits=int(hit), misses=int(not hit))
+        return value if hit else default
+
+    def get_many(self, keys, version=None, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return super().get_many(keys, version=version, **kwargs)
+        keys = list(keys)
+        started = time.perf_counter()
+        found = {}
+        try:
+            found = super().get_many(keys, version=version, **kwargs)
+        finally:
+            metrics.record_cache(started, hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    set = timed('set')
+    add = timed('add')
+    delete = timed('delete')
+    incr = timed('incr')
+    touch = timed('touch')
+    has_key = timed('has_key')
+    set_many = timed('set_many')
+    delete_many = timed('delete_many')
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    pass
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
@@ -0,0 +1,89 @@
+"""
+Prometheus metrics for request, database and cache performance.
+
+Observations come from ``core.middleware.RequestTimingMiddleware``. Under
+gunicorn every worker writes its samples to memory-mapped files in
+``PROMETHEUS_MULTIPROC_DIR`` (set up by ``gunicorn.conf.py``) and a scrape
+of any worker aggregates all of them; without that variable the metrics
+live in the process-local default registry. Celery queue depth is read from
+the broker at scrape time.
+"""
+import logging
+import os
+import redis
+from django.conf import settings
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by view and method',
+    ['view', 'method'], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter('http_requests', 'Requests by view, method and status', ['view', 'method', 'status'])
+IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests being processed', multiprocess_mode='livesum')
+DB_QUERIES = Histogram(
+    'db_queries_per_request', 'SQL queries per request by view', ['view'], buckets=QUERY_COUNT_BUCKETS,
+)
+DB_DURATION = Histogram(
+    'db_duration_seconds', 'SQL time per request by view', ['view'], buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter('cache_requests', 'Cache reads during requests by result', ['result'])
+CACHE_DURATION = Counter('cache_duration_seconds', 'Time spent in cache calls during requests')
+
+
+class CeleryQueueCollector:
+    """Length of the Celery queues in the Redis broker, read on every scrape"""
+
+    def collect(self):
+        gauge = GaugeMetricFamily('celery_queue_length', 'Tasks waiting in the Celery queue', labels=['queue'])
+        try:
+            client = redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+            for queue in settings.PROMETHEUS_CELERY_QUEUES:
+                gauge.add_metric([queue], client.llen(queue))
+        except redis.RedisError:
+            logger.warning('Could not read Celery queue lengths', exc_info=True)
+        yield gauge
+
+
+def observe_request(request, response, metrics):
+    """Record a finished request from its ``RequestMetrics``"""
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else '<unresolved>'
+    REQUEST_LATENCY.labels(view, request.method).observe(metrics.total_time)
+    REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+    DB_QUERIES.labels(view).observe(metrics.db_queries)
+    DB_DURATION.labels(view).observe(metrics.db_time)
+    if metrics.cache_hits:
+        CACHE_REQUESTS.labels('hit').inc(metrics.cache_hits)
+    if metrics.cache_misses:
+        CACHE_REQUESTS.labels('miss').inc(metrics.cache_misses)
+    if metrics.cache_calls:
+        CACHE_DURATION.inc(metrics.cache_time)
+
+
+class DefaultRegistryCollector:
+    """This process' default registry, scraped alongside the extra collectors"""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def build_registry():
+    """Registry to scrape: all worker processes in multiprocess mode, else this one"""
+    registry = CollectorRegistry()
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        MultiProcessCollector(registry)
+    else:
+        registry.register(DefaultRegistryCollector())
+    registry.register(CeleryQueueCollector())
+    return registry
+
+
+def render_metrics():
+    return generate_latest(build_registry())
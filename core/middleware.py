@@ -0,0 +1,167 @@
+"""
+Per-request performance instrumentation.
+
+``RequestTimingMiddleware`` samples requests (``REQUEST_TIMING_SAMPLE_RATE``).
+For a sampled request it installs a ``connection.execute_wrapper`` that
+counts and times SQL queries and publishes a ``RequestMetrics`` through a
+context variable, which the instrumented cache backends (``core.cache``)
+and the serializer hook below add to. The totals are emitted as a
+``Server-Timing`` header and one log line on the ``core.requests`` logger.
+With ``PROMETHEUS_METRICS_ENABLED`` every request is instrumented and
+recorded in ``core.metrics``, but only sampled ones get the header. Other
+requests only pay for a clock read, and are still logged when slower than
+``REQUEST_TIMING_SLOW_MS``.
+"""
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+from . import metrics as prometheus
+
+logger = logging.getLogger('core.requests')
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+@dataclass
+class RequestMetrics:
+    """Timings of one request, in seconds"""
+    db_queries: int = 0
+    db_time: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_calls: int = 0
+    cache_time: float = 0.0
+    serializer_time: float = 0.0
+    view_time: float = 0.0
+    total_time: float = 0.0
+    view_started: float = None
+    serializing: bool = False
+
+    def record_query(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    def record_cache(self, started, hits=0, misses=0):
+        self.cache_time += time.perf_counter() - started
+        self.cache_calls += 1
+        self.cache_hits += hits
+        self.cache_misses += misses
+
+    def server_timing(self):
+        """``Server-Timing`` header value"""
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'cache;dur={self.cache_time * 1000:.1f};desc="{self.cache_hits} hits {self.cache_misses} misses"',
+            f'serializer;dur={self.serializer_time * 1000:.1f}',
+            f'view;dur={self.view_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+    def as_dict(self):
+        return {
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_ms': round(self.cache_time * 1000, 2),
+            'serializer_ms': round(self.serializer_time * 1000, 2),
+            'view_ms': round(self.view_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+        }
+
+
+def install_serializer_timing():
+    """
+    Time ``serializer.data`` of sampled requests. Only the outermost
+    serializer is timed, so nested ``.data`` calls are not counted twice.
+    """
+    original = BaseSerializer.data.fget
+    if getattr(original, 'timed', False):
+        return
+
+    def data(self):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return original(self)
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializing = False
+
+    data.timed = True
+    BaseSerializer.data = property(data)
+
+
+class RequestTimingMiddleware:
+    """Sampled SQL, cache, serializer and view timings per request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_serializer_timing()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        sampled = random.random() < settings.REQUEST_TIMING_SAMPLE_RATE
+        if not sampled and not settings.PROMETHEUS_METRICS_ENABLED:
+            response = self.get_response(request)
+            duration = time.perf_counter() - started
+            if self.is_slow(duration):
+                self.log(request, response, {'total_ms': round(duration * 1000, 2)})
+            return response
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                if settings.PROMETHEUS_METRICS_ENABLED:
+                    stack.enter_context(prometheus.IN_FLIGHT.track_inprogress())
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        finished = time.perf_counter()
+        metrics.total_time = finished - started
+        if metrics.view_started is not None:
+            metrics.view_time = finished - metrics.view_started
+        if settings.PROMETHEUS_METRICS_ENABLED:
+            prometheus.observe_request(request, response, metrics)
+        if sampled and settings.REQUEST_TIMING_HEADER:
+            response['Server-Timing'] = metrics.server_timing()
+        if sampled or self.is_slow(metrics.total_time):
+            self.log(request, response, metrics.as_dict())
+        return response
+
+    def is_slow(self, duration):
+        return settings.REQUEST_TIMING_SLOW_MS and duration * 1000 >= settings.REQUEST_TIMING_SLOW_MS
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    def log(self, request, response, timings):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else ''
+        logger.info(
+            '%s %s %s %s',
+            request.method, request.path, response.status_code,
+            ' '.join(f'{key}={value}' for key, value in timings.items()),
+            extra={'method': request.method, 'path': request.path, 'view': view,
+                   'status': response.status_code, **timings},
+        )
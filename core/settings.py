@@ -79,6 +79,7 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -120,7 +121,7 @@ DATABASES = {
 # Cache
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'core.cache.InstrumentedRedisCache',
         'LOCATION': env('REDIS_URL'),
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
@@ -128,6 +129,28 @@ CACHES = {
     }
 }
 
+# Public product/category responses (see brokers.cache)
+BROKERS_RESPONSE_CACHE_TIMEOUT = env.int('BROKERS_RESPONSE_CACHE_TIMEOUT', default=300)
+
+# Record product detail views (see brokers.analytics); off for benchmarks
+BROKERS_TRACK_PRODUCT_VIEWS = env.bool('BROKERS_TRACK_PRODUCT_VIEWS', default=True)
+
+# Per-request SQL/cache/serializer timings (see core.middleware): fraction of
+# requests instrumented, whether they get a Server-Timing header, and the
+# duration above which any request is logged
+REQUEST_TIMING_SAMPLE_RATE = env.float('REQUEST_TIMING_SAMPLE_RATE', default=1.0 if DEBUG else 0.01)
+REQUEST_TIMING_HEADER = env.bool('REQUEST_TIMING_HEADER', default=DEBUG)
+REQUEST_TIMING_SLOW_MS = env.int('REQUEST_TIMING_SLOW_MS', default=1000)
+
+# Seconds a readiness result (/api/health/ready/) is reused by a worker
+READINESS_CACHE_SECONDS = env.int('READINESS_CACHE_SECONDS', default=5)
+
+# Prometheus metrics at /api/metrics/ (see core.metrics). Scrapes must send
+# "Authorization: Bearer <PROMETHEUS_METRICS_TOKEN>" when a token is set.
+PROMETHEUS_METRICS_ENABLED = env.bool('PROMETHEUS_METRICS_ENABLED', default=True)
+PROMETHEUS_METRICS_TOKEN = env('PROMETHEUS_METRICS_TOKEN', default='')
+PROMETHEUS_CELERY_QUEUES = env.list('PROMETHEUS_CELERY_QUEUES', default=['celery'])
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -173,6 +196,14 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads larger than this are streamed to temporary files instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = env.int('FILE_UPLOAD_MAX_MEMORY_SIZE', default=1024 * 1024)
+FILE_UPLOAD_TEMP_DIR = env('FILE_UPLOAD_TEMP_DIR', default=None)
+
+# Image upload limits, checked from the image header before decoding (core.uploads)
+IMAGE_UPLOAD_MAX_BYTES = env.int('IMAGE_UPLOAD_MAX_BYTES', default=10 * 1024 * 1024)
+IMAGE_UPLOAD_MAX_PIXELS = env.int('IMAGE_UPLOAD_MAX_PIXELS', default=25_000_000)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -268,46 +299,50 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'flush-product-views': {
+        'task': 'brokers.tasks.flush_product_views',
+        'schedule': env.int('PRODUCT_VIEW_EVENTS_FLUSH_INTERVAL', default=10),
+    },
+    'flush-product-view-counts': {
+        'task': 'brokers.tasks.flush_product_view_counts',
+        'schedule': env.int('PRODUCT_VIEW_FLUSH_INTERVAL', default=30),
+    },
+}
 
 # Logging
-# LOGGING = {
-#     'version': 1,
-#     'disable_existing_loggers': False,
-#     'formatters': {
-#         'verbose': {
-#             'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
-#             'style': '{',
-#         },
-#         'simple': {
-#             'format': '{levelname} {message}',
-#             'style': '{',
-#         },
-#     },
-#     'handlers': {
-#         'file': {
-#             'level': 'INFO',
-#             'class': 'logging.FileHandler',
-#             'filename': BASE_DIR / 'logs' / 'django.log',
-#             'formatter': 'verbose',
-#         },
-#         'console': {
-#             'level': 'INFO',
-#             'class': 'logging.StreamHandler',
-#             'formatter': 'simple',
-#         },
-#     },
-#     'root': {
-#         'handlers': ['console'],
-#         'level': 'INFO',
-#     },
-#     'loggers': {
-#         'django': {
-#             'handlers': ['console'],
-#             'level': 'INFO',
-#             'propagate': False,
-#         },
-#     },
-# }
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {
+            'format': '{levelname} {asctime} {name} {process:d} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'verbose',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': env('LOG_LEVEL', default='INFO'),
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.requests': {
+            'handlers': ['console'],
+            'level': env('REQUEST_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
 
 # # =============================================================================
 # # UNFOLD ADMIN CONFIGURATION
@@ -0,0 +1,113 @@
+"""
+Memory-bounded validation of uploaded images.
+
+Django spools uploads larger than ``FILE_UPLOAD_MAX_MEMORY_SIZE`` to
+temporary files, and ``ImageUploadValidator`` checks byte size, format and
+pixel dimensions from the image header only, so oversized images and
+decompression bombs are rejected before anything decodes them. Each
+validation logs its duration and how much of the upload was held in memory
+on the ``core.uploads`` logger.
+"""
+import logging
+import time
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.utils.deconstruct import deconstructible
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Phone cameras save multi-picture JPEGs, which Pillow reports as MPO
+ALLOWED_IMAGE_FORMATS = ('JPEG', 'MPO', 'PNG', 'WEBP', 'GIF')
+
+
+def is_in_memory(file):
+    """Whether an upload (or the upload behind a model ``FieldFile``) is held in memory"""
+    return isinstance(file, InMemoryUploadedFile) or isinstance(getattr(file, 'file', None), InMemoryUploadedFile)
+
+
+@deconstructible
+class ImageUploadValidator:
+    """
+    Validate an uploaded image without decoding it. Limits default to the
+    ``IMAGE_UPLOAD_MAX_BYTES`` and ``IMAGE_UPLOAD_MAX_PIXELS`` settings.
+    """
+
+    def __init__(self, max_bytes=None, max_pixels=None, formats=ALLOWED_IMAGE_FORMATS):
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.formats = tuple(formats)
+
+    def __call__(self, file):
+        if getattr(file, '_committed', False):
+            # Already stored model file, validated when it was uploaded
+            return
+        max_bytes = self.max_bytes or settings.IMAGE_UPLOAD_MAX_BYTES
+        max_pixels = self.max_pixels or settings.IMAGE_UPLOAD_MAX_PIXELS
+        started = time.perf_counter()
+
+        size = getattr(file, 'size', None) or 0
+        if size > max_bytes:
+            raise ValidationError(
+                'Ukuran file maksimal %(limit)s MB.',
+                code='file_too_large',
+                params={'limit': round(max_bytes / 1024 / 1024, 1)},
+            )
+
+        position = file.tell()
+        try:
+            file.seek(0)
+            # Image.open only parses the header; pixel data is never decoded here
+            with Image.open(file) as image:
+                image_format, (width, height) = image.format, image.size
+            header_bytes = file.tell()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            raise ValidationError('File bukan gambar yang valid.', code='invalid_image')
+        finally:
+            file.seek(position)
+
+        if image_format not in self.formats:
+            raise ValidationError(
+                'Format gambar %(format)s tidak didukung.', code='invalid_format', params={'format': image_format}
+            )
+        if width * height > max_pixels:
+            raise ValidationError(
+                'Resolusi gambar maksimal %(limit)s megapiksel.',
+                code='too_many_pixels',
+                params={'limit': round(max_pixels / 1_000_000, 1)},
+            )
+
+        duration = time.perf_counter() - started
+        in_memory = size if is_in_memory(file) else 0
+        logger.info(
+            'Validated image upload %s: %s %dx%d, %d bytes (%d in memory), header %d bytes, %.1f ms',
+            getattr(file, 'name', ''), image_format, width, height, size, in_memory, header_bytes, duration * 1000,
+            extra={
+                'upload_bytes': size,
+                'upload_memory_bytes': in_memory,
+                'upload_pixels': width * height,
+                'upload_duration': duration,
+            },
+        )
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ImageUploadValidator)
+            and (self.max_bytes, self.max_pixels, self.formats) == (other.max_bytes, other.max_pixels, other.formats)
+        )
+
+
+validate_image_upload = ImageUploadValidator()
+
+
+class UploadedImageField(serializers.FileField):
+    """
+    Image upload field validated by ``ImageUploadValidator`` instead of
+    DRF's ``ImageField``, which hands the file to Pillow for verification.
+    """
+
+    def __init__(self, **kwargs):
+        validators = list(kwargs.pop('validators', []))
+        super().__init__(validators=[validate_image_upload, *validators], **kwargs)
@@ -0,0 +1,24 @@
+"""
+Gunicorn hooks, loaded automatically from the working directory.
+
+Workers share Prometheus metrics through memory-mapped files in
+``PROMETHEUS_MULTIPROC_DIR`` (see ``core.metrics``). The variable is set here,
+before any worker imports ``prometheus_client``; the directory is emptied when
+the master starts and files of dead workers are marked on exit.
+"""
+import os
+import shutil
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:24
+
+import core.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("profiles", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="profile",
+            name="profile_picture",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                upload_to="profile_pictures/",
+                validators=[core.uploads.ImageUploadValidator()],
+                verbose_name="Foto Profil",
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.db import models
+from core.uploads import validate_image_upload
 
 
 class Profile(models.Model):
@@ -11,7 +12,9 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     phone_number = models.CharField(max_length=20, blank=True, null=True, verbose_name="Nomor Telepon")
     date_of_birth = models.DateField(blank=True, null=True, verbose_name="Tanggal Lahir")
-    profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True, verbose_name="Foto Profil")
+    profile_picture = models.ImageField(
+        upload_to='profile_pictures/', blank=True, null=True, validators=[validate_image_upload], verbose_name="Foto Profil"
+    )
     bio = models.TextField(max_length=500, blank=True, verbose_name="Bio")
     website = models.URLField(blank=True, verbose_name="Website")
     location = models.CharField(max_length=100, blank=True, verbose_name="Lokasi")
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from core.uploads import UploadedImageField
 from .models import Profile
 
 
@@ -16,6 +17,7 @@ class ProfileSerializer(serializers.ModelSerializer):
     """Serializer for Profile model"""
     
     user = UserSerializer(read_only=True)
+    profile_picture = UploadedImageField(required=False, allow_null=True)
     full_name = serializers.ReadOnlyField()
     display_name = serializers.ReadOnlyField()
     
@@ -32,6 +34,8 @@ class ProfileSerializer(serializers.ModelSerializer):
 class ProfileUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating Profile"""
     
+    profile_picture = UploadedImageField(required=False, allow_null=True)
+    
     class Meta:
         model = Profile
         fields = [
@@ -78,4 +78,4 @@ class UserAuthenticationTestCase(TestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['status'], 'healthy')
+        self.assertEqual(response.json()['status'], 'healthy')
@@ -0,0 +1,45 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from api import health
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, READINESS_CACHE_SECONDS=60)
+class HealthCheckTestCase(TestCase):
+    """Test liveness and readiness endpoints"""
+
+    def setUp(self):
+        health.clear_readiness()
+        self.addCleanup(health.clear_readiness)
+
+    def test_liveness(self):
+        """Test liveness answers without authentication or database queries"""
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('api:health_check'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'healthy')
+
+    def test_ready(self):
+        """Test readiness runs every check and reports round-trip times"""
+        check_broker = mock.Mock()
+        with mock.patch.dict(health.CHECKS, broker=check_broker):
+            response = self.client.get(reverse('api:health_ready'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'ready')
+        self.assertEqual(set(data['checks']), {'database', 'cache', 'migrations', 'broker'})
+        self.assertTrue(all(check['ok'] and check['ms'] >= 0 for check in data['checks'].values()))
+        check_broker.assert_called_once()
+
+    def test_not_ready_is_cached(self):
+        """Test a failing check returns 503 and results are reused within the cache window"""
+        broker = mock.Mock(side_effect=ConnectionRefusedError('Connection refused'))
+        with mock.patch.dict(health.CHECKS, broker=broker):
+            first = self.client.get(reverse('api:health_ready'))
+            second = self.client.get(reverse('api:health_ready'))
+        self.assertEqual(first.status_code, 503)
+        self.assertEqual(first.json()['checks']['broker']['error'], 'ConnectionRefusedError')
+        self.assertEqual(second.json(), first.json())
+        broker.assert_called_once()
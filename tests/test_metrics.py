@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+INSTRUMENTED_CACHES = {'default': {'BACKEND': 'core.cache.InstrumentedLocMemCache'}}
+
+
+def sample_value(body, line_prefix):
+    for line in body.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+@override_settings(
+    CACHES=INSTRUMENTED_CACHES,
+    PROMETHEUS_METRICS_ENABLED=True,
+    PROMETHEUS_METRICS_TOKEN='',
+    REQUEST_TIMING_SAMPLE_RATE=0.0,
+    CELERY_BROKER_URL='redis://127.0.0.1:1/0',
+)
+class MetricsEndpointTestCase(TestCase):
+    """Test the Prometheus metrics endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('api:metrics')
+
+    def scrape(self, **headers):
+        response = self.client.get(self.url, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_request_metrics(self):
+        """Test latency, query and cache metrics are recorded per view"""
+        view = 'http_request_duration_seconds_count{method="GET",view="brokers:product-list"}'
+        before = sample_value(self.scrape(), view) or 0
+        self.client.get(reverse('brokers:product-list'))
+        self.client.get(reverse('brokers:product-list'))
+
+        body = self.scrape()
+        self.assertEqual(sample_value(body, view), before + 2)
+        self.assertIsNotNone(sample_value(body, 'db_queries_per_request_sum{view="brokers:product-list"}'))
+        self.assertGreater(sample_value(body, 'cache_requests_total{result="hit"}'), 0)
+        self.assertIn('http_requests_in_flight', body)
+        # Broker unreachable: the queue metric is declared without samples
+        self.assertIn('# TYPE celery_queue_length gauge', body)
+
+    @override_settings(PROMETHEUS_METRICS_TOKEN='secret')
+    def test_token(self):
+        """Test scrapes need the bearer token when one is configured"""
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.scrape(HTTP_AUTHORIZATION='Bearer secret')
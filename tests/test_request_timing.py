@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+INSTRUMENTED_CACHES = {'default': {'BACKEND': 'core.cache.InstrumentedLocMemCache'}}
+
+
+def parse_server_timing(header):
+    """``{'db': {'dur': '1.2', 'desc': '3 queries'}, ...}``"""
+    metrics = {}
+    for entry in header.split(', '):
+        name, *params = entry.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+        if 'desc' in metrics[name]:
+            metrics[name]['desc'] = metrics[name]['desc'].strip('"')
+    return metrics
+
+
+@override_settings(
+    CACHES=INSTRUMENTED_CACHES,
+    REQUEST_TIMING_SAMPLE_RATE=1.0,
+    REQUEST_TIMING_HEADER=True,
+    REQUEST_TIMING_SLOW_MS=0,
+)
+class RequestTimingMiddlewareTestCase(TestCase):
+    """Test per-request SQL, cache and serializer timing"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('brokers:product-list')
+
+    def test_server_timing_header(self):
+        """Test sampled responses report queries, cache misses then hits, and timings"""
+        with self.assertLogs('core.requests', 'INFO') as logs:
+            first = parse_server_timing(self.client.get(self.url)['Server-Timing'])
+        self.assertEqual(set(first), {'db', 'cache', 'serializer', 'view', 'total'})
+        self.assertGreater(int(first['db']['desc'].split()[0]), 0)
+        self.assertNotIn(' 0 misses', first['cache']['desc'])
+        self.assertLessEqual(float(first['view']['dur']), float(first['total']['dur']))
+
+        record = logs.records[0]
+        self.assertEqual((record.method, record.status, record.view), ('GET', 200, 'brokers:product-list'))
+        self.assertIn('db_queries=', record.getMessage())
+        self.assertGreater(record.serializer_ms, 0)
+
+        second = parse_server_timing(self.client.get(self.url)['Server-Timing'])
+        self.assertTrue(second['cache']['desc'].endswith(' 0 misses'))
+        self.assertEqual(second['db']['desc'], '0 queries')
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0, REQUEST_TIMING_SLOW_MS=0)
+    def test_unsampled(self):
+        """Test unsampled requests get no header and are not logged"""
+        with self.assertNoLogs('core.requests'):
+            response = self.client.get(self.url)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0, REQUEST_TIMING_SLOW_MS=0.001, PROMETHEUS_METRICS_ENABLED=False)
+    def test_slow_requests_logged(self):
+        """Test unsampled requests above the slow threshold log their total time only"""
+        with self.assertLogs('core.requests', 'INFO') as logs:
+            self.client.get(self.url)
+        self.assertRegex(logs.records[0].getMessage(), r'200 total_ms=[\d.]+$')